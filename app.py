@@ -1,90 +1,61 @@
 import streamlit as st
-import pdfplumber
-import re
 import pandas as pd
-import io
-import csv
-from collections import defaultdict
+
+from pdf_parser import parse_pdf, default_workers, APP_RULES
+from catalog_store import Catalog, CatalogStore
+from catalog_file import CATALOG_SUFFIX, is_catalog_file, load_catalog
+from selection_import import CatalogTable, read_selection_csv, import_selection, semester_volume
+from report import build_report_bytes
+from cart import Cart
 
 # --- 頁面設定 ---
 st.set_page_config(page_title="教科書價格查詢系統", layout="wide")
 
-# --- 核心邏輯函數 ---
-def extract_price(t):
-    if not t or "-" in str(t): return 0
-    m = re.search(r'\d+', str(t).replace('\n', '').replace(',', ''))
-    return int(m.group()) if m else 0
-
-def get_subject_weight(sub_name):
-    sort_order = ["國語", "國文", "數學", "生活", "社會", "自然", "藝術", "健體", "健康", "綜合", "英語", "英文"]
-    for i, keyword in enumerate(sort_order):
-        if keyword in sub_name: return i
-    return 999
-
-def parse_pdf(file):
-    db = {}
-    detected_vers = []
-    target_publishers = ["南一", "康軒", "翰林", "育成", "佳音", "何嘉仁", "吉的堡", "台灣培生", "全華", "龍騰", "泰宇", "三民"]
-    col_map = {"年級": 2, "科目": 1, "冊別": 3}
-    
-    with pdfplumber.open(file) as pdf:
-        for page in pdf.pages:
-            tables = page.extract_tables()
-            for table in tables:
-                if not table or len(table[0]) < 4: continue
-                # 偵測欄位索引
-                for r_idx in range(min(10, len(table))):
-                    row = table[r_idx]
-                    for i, cell in enumerate(row):
-                        txt = str(cell or "").replace("\n", "").strip()
-                        for k in target_publishers:
-                            if k in txt and (k, i) not in detected_vers:
-                                detected_vers.append((k, i))
-                        if "年級" in txt: col_map["年級"] = i
-                        if "科目" in txt: col_map["科目"] = i
-                        if "冊" in txt: col_map["冊別"] = i
-                
-                # 解析內容
-                for row in table:
-                    row_str = "".join([str(c) for c in row if c])
-                    if "課本" in row_str or "習作" in row_str:
-                        if row[col_map["科目"]] and row[col_map["年級"]]:
-                            raw_s = str(row[col_map["科目"]]).strip()
-                            s_name = re.sub(r'^\d+\s*|\s*\d+$', '', raw_s)
-                            g_name = str(row[col_map["年級"]]).strip()
-                            v_name = str(row[col_map["冊別"]]).strip()
-                            key = (g_name, s_name, v_name)
-                            cat = "課" if "課本" in row_str else "習"
-                            
-                            price_dict = {}
-                            for ver_name, col_idx in detected_vers:
-                                if col_idx < len(row):
-                                    price_dict[ver_name] = extract_price(row[col_idx])
-                            
-                            if key not in db: db[key] = {"課": {}, "習": {}}
-                            db[key][cat].update(price_dict)
-    
-    versions = [v[0] for v in sorted(detected_vers, key=lambda x: x[1])]
-    return db, versions
-
 # --- 初始化 Session State ---
 if 'cart' not in st.session_state:
-    st.session_state.cart = []
+    st.session_state.cart = Cart()
 if 'db' not in st.session_state:
     st.session_state.db = None
 if 'versions' not in st.session_state:
     st.session_state.versions = []
+if 'index' not in st.session_state:
+    st.session_state.index = None
+
+if 'catalog_store' not in st.session_state:
+    st.session_state.catalog_store = CatalogStore()
 
 # --- 側邊欄：檔案上傳 ---
 st.sidebar.title("🛠️ 控制面板")
-uploaded_pdf = st.sidebar.file_uploader("1. 載入價格 PDF", type="pdf")
+uploaded_pdfs = st.sidebar.file_uploader("1. 載入價格 PDF 或編譯目錄檔（可多選）", type=["pdf", CATALOG_SUFFIX[1:]],
+                                         accept_multiple_files=True)
+parse_workers = st.sidebar.number_input("解析程序數", min_value=1, max_value=16, value=default_workers())
 
-if uploaded_pdf and st.session_state.db is None:
-    with st.spinner("解析 PDF 中..."):
-        db, versions = parse_pdf(uploaded_pdf)
-        st.session_state.db = db
-        st.session_state.versions = versions
-        st.sidebar.success("PDF 載入成功！")
+# 只解析新加入的檔案；以上傳檔 file_id 作為目錄鍵，移除的檔案一併移出
+store = st.session_state.catalog_store
+for uploaded_pdf in uploaded_pdfs:
+    if uploaded_pdf.file_id in store: continue
+    if is_catalog_file(uploaded_pdf.name):
+        try:
+            db, versions, index = load_catalog(uploaded_pdf.getvalue())
+        except ValueError as e:
+            st.sidebar.error(f"{uploaded_pdf.name}：{e}")
+            continue
+    else:
+        bar = st.sidebar.progress(0.0, text=f"解析 {uploaded_pdf.name} 中...")
+        db, versions, index = parse_pdf(uploaded_pdf, workers=parse_workers, rules=APP_RULES,
+                                        progress=lambda done, total: bar.progress(done / total, text=f"解析 PDF 中：{done} / {total} 頁"))
+        bar.empty()
+    store.add(Catalog(uploaded_pdf.file_id, uploaded_pdf.name, db, versions, index))
+    st.sidebar.success(f"{uploaded_pdf.name} 載入成功！")
+for c in list(store):
+    if c.key not in {f.file_id for f in uploaded_pdfs}: store.remove(c.key)
+
+if len(store):
+    labels = {c.key: c.label for c in store}
+    selected = st.sidebar.multiselect("使用的價格目錄", list(labels), default=list(labels), format_func=labels.get)
+    st.session_state.db, st.session_state.versions, st.session_state.index = store.view(selected)
+else:
+    st.session_state.db, st.session_state.versions, st.session_state.index = None, [], None
 
 # 下載範例檔
 template_csv = "教科書一覽表,,,,,,\n科目/年級,一年級,二年級,三年級,四年級,五年級,六年級\n國語,康軒,康軒,南一,康軒,南一,康軒\n數學,南一,南一,南一,南一,翰林,南一\n生活,翰林,翰林,,,,\n健康與體育,翰林,翰林,南一,康軒,南一,南一\n自然科學,,,南一,翰林,南一,翰林\n社會,,,康軒,康軒,南一,翰林\n英語,,,康軒,翰林,翰林,何嘉仁\n綜合活動,,,翰林,康軒,康軒,南一\n藝術,,,康軒,翰林,康軒,康軒\n"
@@ -94,96 +65,66 @@ st.sidebar.download_button("📥 下載一覽表範例檔", data=template_csv.en
 uploaded_csv = st.sidebar.file_uploader("2. 匯入選用一覽表 (CSV)", type="csv")
 if uploaded_csv and st.session_state.db:
     if st.sidebar.button("🚀 執行自動匯入"):
-        df = pd.read_csv(uploaded_csv, encoding='utf-8-sig', header=1)
-        grade_cols = {"一年級":"1", "二年級":"2", "三年級":"3", "四年級":"4", "五學年":"5", "六年級":"6", "五年級":"5"}
-        
-        for _, row in df.iterrows():
-            subject = str(row[0]).strip()
-            for g_zh, g_num in grade_cols.items():
-                if g_zh in df.columns:
-                    version = str(row[g_zh]).strip()
-                    if version and version != "nan" and version != "":
-                        vols = sorted(list(set([k[2] for k in st.session_state.db.keys() if k[0] == g_num and k[1] == subject])))
-                        if vols:
-                            target_vol = ""
-                            for v in vols:
-                                if str(int(g_num)*2) in v: target_vol = v; break
-                            if not target_vol: target_vol = vols[0]
-                            
-                            res = st.session_state.db.get((g_num, subject, target_vol), {})
-                            pb = res.get("課", {}).get(version, 0)
-                            pw = res.get("習", {}).get(version, 0)
-                            st.session_state.cart.append({"年級": f"{g_num}年", "科目": subject, "版本": version, "冊別": target_vol, "課本": pb, "習作": pw, "小計": pb+pw})
-        st.sidebar.success("匯入完成！")
+        # 科目依別名索引對應（國語/國文、健康與體育/健體…），對應不到的列出來而不是略過
+        issues = []
+        table = CatalogTable(st.session_state.db, st.session_state.index)
+        # 沿用網頁版原本的規則：冊別優先取含「年級 × 2」者，查無價格的格子仍以 0 加入清單
+        rows = import_selection(read_selection_csv(uploaded_csv.getvalue().decode('utf-8-sig')), table, issues,
+                                pick_volume=semester_volume, keep_unpriced=True)
+        st.session_state.cart.extend(rows)
+        st.sidebar.success(f"匯入完成！共 {len(rows)} 筆。")
+        if issues:
+            st.sidebar.warning("以下科目未匯入：\n\n" + "\n".join(f"- {i['年級']} {i['一覽表科目']}：{i['問題']}" for i in issues))
 
 # --- 主介面 ---
+# 各區塊為獨立的 fragment，切換選單只重新執行所在區塊；清單改變時才重新執行整頁
 st.title("📚 進階教科書價格查詢系統")
 
-col1, col2 = st.columns([1, 2])
 
-with col1:
+@st.fragment
+def manual_add_panel():
     st.subheader("🔍 手動新增")
-    if st.session_state.db:
-        grades = sorted(list(set([k[0] for k in st.session_state.db.keys()])))
-        grade = st.selectbox("選擇年級", grades)
-        
-        subjects = sorted(list(set([k[1] for k in st.session_state.db.keys() if k[0] == grade])), key=get_subject_weight)
-        subject = st.selectbox("選擇科目", subjects)
-        
-        vols = sorted(list(set([k[2] for k in st.session_state.db.keys() if k[0] == grade and k[1] == subject])))
-        vol = st.selectbox("選擇冊別", vols)
-        
-        version = st.radio("選擇版本", st.session_state.versions, horizontal=True)
-        
-        if st.button("➕ 加入清單"):
-            res = st.session_state.db.get((grade, subject, vol), {})
-            pb = res.get("課", {}).get(version, 0)
-            pw = res.get("習", {}).get(version, 0)
-            st.session_state.cart.append({"年級": f"{grade}年", "科目": subject, "版本": version, "冊別": vol, "課本": pb, "習作": pw, "小計": pb+pw})
+    if not st.session_state.db: return
+    index = st.session_state.index
+    grade = st.selectbox("選擇年級", index.grades)
+    subject = st.selectbox("選擇科目", index.subjects(grade))
+    vol = st.selectbox("選擇冊別", index.volumes(grade, subject))
 
-with col2:
+    version = st.radio("選擇版本", st.session_state.versions, horizontal=True)
+
+    if st.button("➕ 加入清單"):
+        key = (grade, subject, vol)
+        pb, pw = st.session_state.db.price(key, "課", version), st.session_state.db.price(key, "習", version)
+        st.session_state.cart.add({"年級": f"{grade}年", "科目": subject, "版本": version, "冊別": vol, "課本": pb, "習作": pw, "小計": pb+pw})
+        st.rerun()
+
+
+@st.fragment
+def cart_view():
     st.subheader("📋 查詢清單")
-    if st.session_state.cart:
-        df_cart = pd.DataFrame(st.session_state.cart)
-        st.table(df_cart)
-        if st.button("🔄 清空清單"):
-            st.session_state.cart = []
-            st.rerun()
+    if not st.session_state.cart: return
+    st.table(st.session_state.cart.cached("frame", lambda c: pd.DataFrame(list(c))))
+    if st.button("🔄 清空清單"):
+        st.session_state.cart.clear()
+        st.rerun()
 
-# --- 匯出報表 ---
-if st.session_state.cart:
+
+@st.fragment
+def report_export():
     st.divider()
     st.subheader("📊 報表匯出")
-    
-    # 計算邏輯 (總計置頂)
-    grade_groups = defaultdict(list)
-    grade_totals = defaultdict(int)
-    for item in st.session_state.cart:
-        grade_groups[item['年級']].append(item)
-        grade_totals[item['年級']] += item['小計']
-    
-    # 產生 CSV 字串
-    output = io.StringIO()
-    writer = csv.writer(output)
-    sorted_grades = sorted(grade_groups.keys())
-    
-    # 寫入總計置頂
-    writer.writerow([f"【{g}】" for g in sorted_grades for _ in range(5)])
-    writer.writerow(["★年級總計", "", "", grade_totals[g], ""] * len(sorted_grades))
-    writer.writerow([])
-    
-    max_b = max(len(grade_groups[g]) for g in sorted_grades)
-    for b_idx in range(max_b):
-        r1, r2, r3 = [], [], []
-        for g in sorted_grades:
-            books = grade_groups[g]
-            if b_idx < len(books):
-                b = books[b_idx]
-                r1 += ["科目", b['科目'], "課本", b['課本'], ""]
-                r2 += ["版本", b['版本'], "習作", b['習作'], ""]
-                r3 += ["冊別", b['冊別'], "小計", b['小計'], ""]
-            else:
-                r1 += [""]*5; r2 += [""]*5; r3 += [""]*5
-        writer.writerow(r1); writer.writerow(r2); writer.writerow(r3); writer.writerow([])
-        
-    st.download_button("💾 下載費用明細表 (總計已置頂)", data=output.getvalue().encode('utf-8-sig'), file_name="教科書費用明細表.csv", mime="text/csv")
+    # 報表（總計置頂）只在按下下載時才產生
+    cart = st.session_state.cart
+    st.download_button("💾 下載費用明細表 (總計已置頂)", data=lambda: cart.cached("report", build_report_bytes),
+                       file_name="教科書費用明細表.csv", mime="text/csv", on_click="ignore")
+
+
+col1, col2 = st.columns([1, 2])
+with col1:
+    manual_add_panel()
+with col2:
+    cart_view()
+
+# --- 匯出報表 ---
+if st.session_state.cart:
+    report_export()
@@ -0,0 +1,125 @@
+"""
+批次計價：一份價格 PDF 只解析一次，為目錄中每所學校的版本一覽表各產生一份費用明細表，並輸出總表。
+對照邏輯與介面上的「自動匯入」相同（selection_import）。
+
+用法：
+  python batch_price.py 價格.pdf 一覽表目錄 --out 輸出目錄
+  python batch_price.py 價格.pdf 一覽表目錄 --out 輸出目錄 --jobs 8 --no-cache
+"""
+import os
+import csv
+import sys
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+from pdf_parser import parse_pdf, default_workers
+from catalog_cache import CatalogCache
+from selection_import import CatalogTable, read_selection_csv, import_selection
+from report import group_by_grade, write_report
+
+SUMMARY_NAME = "費用總表.csv"
+
+
+def read_text(path):
+    """
+    讀取一覽表；Excel 另存的 CSV 常見 UTF-8（含 BOM）或 Big5 兩種編碼
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    for encoding in ("utf-8-sig", "cp950"):
+        try:
+            return raw.decode(encoding)
+        except UnicodeDecodeError:
+            pass
+    raise ValueError("無法辨識檔案編碼（請存成 UTF-8 或 Big5）")
+
+
+def load_catalog(pdf_path, workers=1, use_cache=True):
+    """
+    解析價格 PDF，回傳 (db, versions, index)；預設使用與 main2 共用的解析快取
+    """
+    if not use_cache:
+        return parse_pdf(pdf_path, workers=workers)
+    with open(pdf_path, "rb") as f:
+        data = f.read()
+    _, parsed, _ = CatalogCache().load_or_parse(data, lambda: parse_pdf(pdf_path, workers=workers))
+    return parsed
+
+
+def price_school(csv_path, table, out_dir):
+    """
+    為單一學校計價並寫出費用明細表，回傳總表的一列
+    """
+    school = os.path.splitext(os.path.basename(csv_path))[0]
+    issues = []
+    try:
+        cart = import_selection(read_selection_csv(read_text(csv_path)), table, issues)
+    except Exception as e:
+        return {"學校": school, "項目數": 0, "年級總計": {}, "總計": 0, "狀態": f"錯誤：{e}", "未對應科目": ""}
+    out_path = os.path.join(out_dir, f"{school}_費用明細表.csv")
+    with open(out_path, "w", newline="", encoding="utf-8-sig") as f:
+        write_report(cart, f)
+    _, grade_totals = group_by_grade(cart)
+    return {"學校": school, "項目數": len(cart), "年級總計": dict(grade_totals),
+            "總計": sum(grade_totals.values()), "狀態": "完成" if cart else "無對應項目",
+            "未對應科目": "；".join(f"{i['年級']} {i['一覽表科目']}（{i['問題']}）" for i in issues)}
+
+
+def write_summary(results, path):
+    """
+    總表：每校一列，依年級列出總計
+    """
+    grades = sorted({g for r in results for g in r["年級總計"]}, key=lambda g: int(g.rstrip("年")))
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(["學校", "項目數"] + grades + ["總計", "狀態", "未對應科目"])
+        for r in results:
+            writer.writerow([r["學校"], r["項目數"]] + [r["年級總計"].get(g, "") for g in grades]
+                            + [r["總計"], r["狀態"], r["未對應科目"]])
+
+
+def run(pdf_path, csv_dir, out_dir, jobs=None, workers=1, use_cache=True):
+    csv_paths = sorted(os.path.join(csv_dir, name) for name in os.listdir(csv_dir) if name.lower().endswith(".csv"))
+    if not csv_paths:
+        raise SystemExit(f"{csv_dir} 中沒有 CSV 檔")
+    os.makedirs(out_dir, exist_ok=True)
+
+    t = time.perf_counter()
+    db, versions, index = load_catalog(pdf_path, workers, use_cache)
+    if not db:
+        raise SystemExit("⚠️ 無法解析此 PDF。")
+    table = CatalogTable(db, index)
+    # 先建立索引的雜湊表，避免各執行緒第一次查詢時同時建立
+    table.price_keys.get_indexer(table.price_keys[:1])
+    print(f"價格目錄：{len(db)} 筆項目，版本 {', '.join(versions)}（{time.perf_counter() - t:.1f} 秒）")
+
+    # 各校共用同一份唯讀的 CatalogTable，以執行緒平行處理
+    t = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        results = list(pool.map(lambda p: price_school(p, table, out_dir), csv_paths))
+    write_summary(results, os.path.join(out_dir, SUMMARY_NAME))
+    for r in results:
+        print(f"  {r['學校']}：{r['狀態']}，{r['項目數']} 項，總計 {r['總計']}")
+        if r["未對應科目"]: print(f"    未對應科目：{r['未對應科目']}")
+    print(f"完成 {len(results)} 所學校（{time.perf_counter() - t:.1f} 秒），輸出至 {out_dir}")
+    return results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="教科書費用批次計價")
+    ap.add_argument("pdf", help="價格 PDF")
+    ap.add_argument("csv_dir", help="各校版本一覽表 (CSV) 所在目錄")
+    ap.add_argument("--out", default="費用明細表", help="輸出目錄（預設：./費用明細表）")
+    ap.add_argument("--jobs", type=int, help="同時處理的學校數（預設依 CPU 數）")
+    ap.add_argument("--workers", type=int, default=default_workers(), help="PDF 解析程序數")
+    ap.add_argument("--no-cache", action="store_true", help="不使用解析快取，強制重新解析 PDF")
+    args = ap.parse_args(argv)
+    results = run(args.pdf, args.csv_dir, args.out, args.jobs, args.workers, not args.no_cache)
+    return 1 if any(r["狀態"].startswith("錯誤") for r in results) else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+效能基準測試：以合成價格 PDF 與選用一覽表量測各階段的執行時間與記憶體峰值。
+
+階段：
+  parse    parse_pdf（可比較不同解析程序數）
+  table    建立匯入用的 CatalogTable
+  import   一覽表自動匯入
+  lookup   連動選單查詢（年級 → 科目 → 冊別 → 各版本價格）
+  export   費用明細表 CSV 匯出
+
+用法：
+  python benchmarks/bench.py --pages 10 100 1000 --workers 1 4 --json result.json
+  python benchmarks/bench.py --pages 100 --baseline result.json   # 與先前結果比較，變慢超過門檻即回傳非 0
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synth_pdf import write_pdf, write_selection_csv
+from pdf_parser import parse_pdf
+from selection_import import CatalogTable, read_selection_csv, import_selection
+from report import build_report_csv
+
+
+def measure(fn, memory=True):
+    """
+    回傳 (結果, 秒數, 記憶體峰值 MB)。時間在未追蹤記憶體時量測，
+    記憶體峰值另以 tracemalloc 再執行一次取得（追蹤會大幅拖慢執行）
+    """
+    t = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t
+    peak = None
+    if memory:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def cascading_lookups(db, versions, index):
+    """
+    模擬介面上把每個年級、科目、冊別、版本都點過一次
+    """
+    n = 0
+    for g in index.grades:
+        for s in index.subjects(g):
+            for v in index.volumes(g, s):
+                res = db.get((g, s, v), {})
+                for ver in versions:
+                    res.get("課", {}).get(ver, 0)
+                    res.get("習", {}).get(ver, 0)
+                    n += 1
+    return n
+
+
+def full_cart(db, versions):
+    """
+    每個項目以第一個版本加入清單，作為大型報表匯出的輸入
+    """
+    cart = []
+    for (g, s, v), res in db.items():
+        pb, pw = res.get("課", {}).get(versions[0], 0), res.get("習", {}).get(versions[0], 0)
+        cart.append({"年級": f"{g}年", "科目": s, "版本": versions[0], "冊別": v, "課本": pb, "習作": pw, "小計": pb + pw})
+    return cart
+
+
+def run(pages, workers_list, out_dir, memory=True, publishers=6):
+    pdf_path = os.path.join(out_dir, f"synth_{pages}p.pdf")
+    csv_path = os.path.join(out_dir, "selection.csv")
+    if not os.path.exists(pdf_path): write_pdf(pdf_path, pages=pages, publishers=publishers)
+    if not os.path.exists(csv_path): write_selection_csv(csv_path, publishers=publishers)
+    raw_csv = open(csv_path, encoding="utf-8-sig").read()
+
+    results = []
+
+    def record(stage, elapsed, peak, **extra):
+        results.append(dict(pages=pages, stage=stage, seconds=round(elapsed, 4),
+                            peak_mb=None if peak is None else round(peak, 2), **extra))
+
+    parsed = None
+    for w in workers_list:
+        # 平行解析的記憶體大多在子程序中，tracemalloc 量不到，只記錄時間
+        parsed, elapsed, peak = measure(lambda: parse_pdf(pdf_path, workers=w), memory=memory and w == 1)
+        record("parse", elapsed, peak, workers=w, items=len(parsed[0]))
+    db, versions, index = parsed
+
+    table, elapsed, peak = measure(lambda: CatalogTable(db), memory)
+    record("table", elapsed, peak)
+    cart, elapsed, peak = measure(lambda: import_selection(read_selection_csv(raw_csv), table), memory)
+    record("import", elapsed, peak, rows=len(cart))
+    n, elapsed, peak = measure(lambda: cascading_lookups(db, versions, index), memory)
+    record("lookup", elapsed, peak, lookups=n)
+    cart = full_cart(db, versions)
+    _, elapsed, peak = measure(lambda: build_report_csv(cart), memory)
+    record("export", elapsed, peak, rows=len(cart))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    與基準結果比對，回傳變慢超過門檻的項目說明
+    """
+    def key(r): return (r["pages"], r["stage"], r.get("workers"))
+    base = {key(r): r for r in baseline}
+    slow = []
+    for r in results:
+        b = base.get(key(r))
+        # 太短的階段受計時誤差影響大，不列入比較
+        if b and b["seconds"] > 0.01 and r["seconds"] > b["seconds"] * (1 + threshold):
+            slow.append(f"{key(r)}: {b['seconds']}s → {r['seconds']}s")
+    return slow
+
+
+def main():
+    ap = argparse.ArgumentParser(description="教科書價格查詢效能基準測試")
+    ap.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000])
+    ap.add_argument("--workers", type=int, nargs="+", default=[1], help="要比較的解析程序數")
+    ap.add_argument("--publishers", type=int, default=6)
+    ap.add_argument("--out-dir", help="合成檔案存放位置（預設為暫存目錄，可重複使用）")
+    ap.add_argument("--no-memory", action="store_true", help="不量測記憶體峰值（較快）")
+    ap.add_argument("--json", help="將結果寫入 JSON 檔")
+    ap.add_argument("--baseline", help="與先前的 JSON 結果比較")
+    ap.add_argument("--threshold", type=float, default=0.2, help="視為退步的變慢比例（預設 20%%）")
+    args = ap.parse_args()
+
+    out_dir = args.out_dir or os.path.join(tempfile.gettempdir(), "textbook_bench")
+    os.makedirs(out_dir, exist_ok=True)
+
+    results = []
+    print(f"{'頁數':>6} {'階段':<8} {'程序':>4} {'秒數':>10} {'峰值MB':>10}  其他")
+    for pages in args.pages:
+        for r in run(pages, args.workers, out_dir, not args.no_memory, args.publishers):
+            extra = {k: v for k, v in r.items() if k not in ("pages", "stage", "seconds", "peak_mb", "workers")}
+            peak = "-" if r["peak_mb"] is None else r["peak_mb"]
+            print(f"{r['pages']:>6} {r['stage']:<8} {r.get('workers', ''):>4} {r['seconds']:>10} {peak:>10}  {extra}")
+            results.append(r)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            slow = compare(results, json.load(f), args.threshold)
+        for line in slow: print("⚠️ 退步：" + line)
+        sys.exit(1 if slow else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+多人同時使用的負載測試：在同一個程序內以 streamlit AppTest 模擬多個工作階段同時操作 main2.py
+（與實際伺服器相同，st.cache_resource 的共用快取由所有工作階段共用），每個工作階段：
+
+  upload   上傳合成價格 PDF（背景解析開始）
+  poll     解析期間定時重新執行，直到解析完成
+  import   匯入選用一覽表
+  select   切換年級選單（只重新執行手動新增區塊）
+  add      加入清單
+  export   產生費用明細表
+
+輸出各動作重新執行時間的 p50/p95、解析吞吐量（每秒頁數）與每個工作階段的記憶體用量（程序 RSS 增量平均）。
+不需啟動瀏覽器或伺服器；上傳元件改為讀取本測試產生的檔案。
+
+AppTest 的執行環境是全域狀態，同一時間只能執行一個頁面，因此各工作階段的重新執行會排隊；
+回應時間（含排隊）與伺服器上多個腳本執行緒搶同一個 GIL 的情況相近，另列不含排隊的執行時間。
+背景解析不受此限制，各工作階段的解析仍同時進行。
+
+用法：
+  python benchmarks/loadtest.py --sessions 20 --pages 50
+  python benchmarks/loadtest.py --sessions 50 --catalogs 5 --json load.json
+  python benchmarks/loadtest.py --sessions 20 --baseline load.json   # 變慢超過門檻即回傳非 0
+"""
+import os
+import gc
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.synth_pdf import write_pdf, write_selection_csv
+from report import build_report_bytes
+
+APP_PATH = os.path.join(ROOT, "main2.py")
+# 見模組說明：AppTest 一次只能執行一個頁面
+_RUN_LOCK = threading.Lock()
+
+
+def _session_script(app_path):
+    # AppTest 以這個函式的原始碼作為頁面：上傳元件改為回傳本工作階段的測試檔，再照常執行 main2.py
+    import io
+    import runpy
+    import streamlit as st
+    from streamlit.delta_generator import DeltaGenerator
+
+    class FixtureFile(io.BytesIO):
+        def __init__(self, name, data):
+            super().__init__(data)
+            self.name = name
+            self.file_id = f"loadtest-{name}"
+
+    def file_uploader(self, label, type=None, accept_multiple_files=False, **kwargs):
+        types = [type] if isinstance(type, str) else list(type or [])
+        name, data = st.session_state["_loadtest_files"]["csv" if "csv" in types else "pdf"]
+        f = FixtureFile(name, data)
+        return [f] if accept_multiple_files else f
+
+    DeltaGenerator.file_uploader = file_uploader
+    runpy.run_path(app_path, run_name="__main__")
+
+
+def rss_mb():
+    """
+    目前程序的常駐記憶體（MB）；非 Linux 系統以峰值代替
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def percentile(values, q):
+    if not values: return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+class Session:
+    """
+    一個模擬使用者：依序上傳、匯入、操作選單與匯出，記錄每次重新執行的時間
+    """
+
+    def __init__(self, pdf, csv, adds=5, poll=0.5, timeout=600):
+        self.at = AppTest.from_function(_session_script, args=(APP_PATH,), default_timeout=timeout)
+        self.at.session_state["_loadtest_files"] = {"pdf": pdf, "csv": csv}
+        self.adds = adds
+        self.poll = poll
+        self.latencies = []  # (動作, 回應秒數（含排隊）, 執行秒數)
+        self.parse_seconds = None
+        self.export_seconds = None
+        self.error = None
+
+    def _run(self, action, widget=None):
+        queued = time.perf_counter()
+        with _RUN_LOCK:
+            started = time.perf_counter()
+            (widget or self.at).run()
+        finished = time.perf_counter()
+        self.latencies.append((action, finished - queued, finished - started))
+        if self.at.exception: raise RuntimeError(self.at.exception[0].value)
+
+    def _widget(self, widgets, label):
+        return next(w for w in widgets if label in w.label)
+
+    def run(self):
+        try:
+            at = self.at
+            started = time.perf_counter()
+            self._run("upload")
+            while at.session_state.parse_jobs:
+                time.sleep(self.poll)
+                self._run("poll")
+            self.parse_seconds = time.perf_counter() - started
+
+            self._run("import", self._widget(at.sidebar.button, "匯入").click())
+            grades = at.session_state.index.grades
+            for i in range(self.adds):
+                self._run("select", self._widget(at.selectbox, "選擇年級").set_value(grades[i % len(grades)]))
+                self._run("add", self._widget(at.button, "加入清單").click())
+
+            t = time.perf_counter()
+            at.session_state.cart.cached("report", build_report_bytes)
+            self.export_seconds = time.perf_counter() - t
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+
+
+def run(sessions, pages, catalogs, out_dir, adds=5, ramp=0.0, poll=0.5, publishers=6):
+    # 各工作階段輪流使用 catalogs 份不同的價格 PDF（同一份只會解析一次，其餘等待共用結果）
+    fixtures = []
+    for seed in range(catalogs):
+        path = os.path.join(out_dir, f"load_{pages}p_{seed}.pdf")
+        if not os.path.exists(path): write_pdf(path, pages=pages, publishers=publishers, seed=seed)
+        with open(path, "rb") as f:
+            fixtures.append((os.path.basename(path), f.read()))
+    csv_path = os.path.join(out_dir, "selection.csv")
+    if not os.path.exists(csv_path): write_selection_csv(csv_path, publishers=publishers)
+    with open(csv_path, "rb") as f:
+        csv = ("selection.csv", f.read())
+
+    gc.collect()
+    base_rss = rss_mb()
+    users = [Session(fixtures[i % catalogs], csv, adds, poll) for i in range(sessions)]
+    threads = [threading.Thread(target=u.run, name=f"session {i}", daemon=True) for i, u in enumerate(users)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+        if ramp: time.sleep(ramp / sessions)
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    # 工作階段仍保留在記憶體中（相當於使用者尚未離開），增量即為各工作階段的資料與共用快取
+    per_session_mb = (rss_mb() - base_rss) / sessions
+
+    done = [u for u in users if not u.error]
+    parse_done = [u.parse_seconds for u in done]
+    by_action, run_by_action = {}, {}
+    for u in done:
+        for action, seconds, run_seconds in u.latencies:
+            by_action.setdefault(action, []).append(seconds)
+            run_by_action.setdefault(action, []).append(run_seconds)
+    # 使用者操作觸發的重新執行；上傳與解析期間的輪詢另列
+    interactive = [s for action, values in by_action.items() if action not in ("upload", "poll") for s in values]
+    result = {
+        "sessions": sessions, "pages": pages, "catalogs": catalogs, "errors": [u.error for u in users if u.error],
+        "seconds": round(elapsed, 2),
+        "rerun_p50_ms": _ms(percentile(interactive, 50)), "rerun_p95_ms": _ms(percentile(interactive, 95)),
+        "actions": {action: {"n": len(values), "p50_ms": _ms(percentile(values, 50)),
+                             "p95_ms": _ms(percentile(values, 95)),
+                             "run_p50_ms": _ms(percentile(run_by_action[action], 50))}
+                    for action, values in by_action.items()},
+        # 實際解析的頁數（相同內容只解析一次）除以最後一份解析完成所需時間
+        "parse_pages_per_s": round(pages * min(catalogs, sessions) / max(parse_done), 1) if parse_done else None,
+        "parse_wait_p50_s": _round(percentile(parse_done, 50)), "parse_wait_p95_s": _round(percentile(parse_done, 95)),
+        "export_p95_ms": _ms(percentile([u.export_seconds for u in done], 95)),
+        "memory_per_session_mb": round(per_session_mb, 1),
+    }
+    return result
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def _round(seconds):
+    return None if seconds is None else round(seconds, 2)
+
+
+def compare(result, baseline, threshold):
+    """
+    與基準結果比對，回傳退步項目說明（時間變長或吞吐量下降超過門檻）
+    """
+    slow = []
+    for key in ("rerun_p50_ms", "rerun_p95_ms", "parse_wait_p95_s", "export_p95_ms", "memory_per_session_mb"):
+        b, r = baseline.get(key), result.get(key)
+        if b and r and r > b * (1 + threshold): slow.append(f"{key}: {b} → {r}")
+    b, r = baseline.get("parse_pages_per_s"), result.get("parse_pages_per_s")
+    if b and r and r < b * (1 - threshold): slow.append(f"parse_pages_per_s: {b} → {r}")
+    return slow
+
+
+def main():
+    ap = argparse.ArgumentParser(description="main2.py 多人同時使用負載測試")
+    ap.add_argument("--sessions", type=int, default=10, help="同時模擬的工作階段數")
+    ap.add_argument("--pages", type=int, default=20, help="合成價格 PDF 頁數")
+    ap.add_argument("--catalogs", type=int, default=1, help="不同價格 PDF 的份數（各工作階段輪流使用）")
+    ap.add_argument("--adds", type=int, default=5, help="每個工作階段手動加入清單的次數")
+    ap.add_argument("--ramp", type=float, default=0.0, help="在幾秒內陸續啟動所有工作階段（預設同時啟動）")
+    ap.add_argument("--poll", type=float, default=0.5, help="解析期間重新執行的間隔秒數")
+    ap.add_argument("--out-dir", help="合成檔案存放位置（預設為暫存目錄，可重複使用）")
+    ap.add_argument("--json", help="將結果寫入 JSON 檔")
+    ap.add_argument("--baseline", help="與先前的 JSON 結果比較")
+    ap.add_argument("--threshold", type=float, default=0.2, help="視為退步的比例（預設 20%%）")
+    args = ap.parse_args()
+
+    out_dir = args.out_dir or os.path.join(tempfile.gettempdir(), "textbook_bench")
+    os.makedirs(out_dir, exist_ok=True)
+    # 每次測試使用全新的解析快取，才會真的解析；須在匯入 main2 使用的模組前設定
+    os.environ["TEXTBOOK_CACHE_DIR"] = tempfile.mkdtemp(prefix="textbook_load_cache_")
+    # 無瀏覽器執行時 streamlit 每次重新執行都會輸出警告，只保留錯誤
+    logging.disable(logging.WARNING)
+
+    result = run(args.sessions, args.pages, args.catalogs, out_dir, args.adds, args.ramp, args.poll)
+    print(f"{result['sessions']} 個工作階段，{result['catalogs']} 份 {result['pages']} 頁 PDF，共 {result['seconds']} 秒")
+    print(f"{'動作':<8} {'次數':>6} {'p50 ms':>10} {'p95 ms':>10} {'執行 p50':>10}")
+    for action, r in result["actions"].items():
+        print(f"{action:<8} {r['n']:>6} {r['p50_ms']:>10} {r['p95_ms']:>10} {r['run_p50_ms']:>10}")
+    print(f"互動重新執行 p50 {result['rerun_p50_ms']} ms、p95 {result['rerun_p95_ms']} ms")
+    print(f"解析吞吐量 {result['parse_pages_per_s']} 頁/秒，等待解析完成 p50 {result['parse_wait_p50_s']} 秒、"
+          f"p95 {result['parse_wait_p95_s']} 秒")
+    print(f"匯出 p95 {result['export_p95_ms']} ms，每個工作階段約 {result['memory_per_session_mb']} MB")
+    for error in result["errors"]: print("❌ " + error)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    failed = bool(result["errors"])
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            slow = compare(result, json.load(f), args.threshold)
+        for line in slow: print("⚠️ 退步：" + line)
+        failed = failed or bool(slow)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+合成測試資料產生器：輸出與 main2.py 解析邏輯相同版面的價格 PDF 與選用一覽表 CSV。
+
+版面：每頁一張有框線的表格，標題列為「序號/科目/年級/冊別/品項/出版社...」，
+資料列為課本/習作兩列一組，價格以 "075"、",75" 等實際 PDF 常見寫法混合輸出。
+不依賴任何 PDF 套件，直接寫出 PDF 物件（中文字以 Identity-H 編碼並附 ToUnicode 對照）。
+"""
+import argparse
+import random
+
+PUBLISHERS = ["南一", "康軒", "翰林", "育成", "佳音", "何嘉仁", "吉的堡", "台灣培生", "全華", "龍騰", "泰宇", "三民"]
+SUBJECTS = ["國語", "數學", "生活", "社會", "自然", "藝術", "健體", "綜合", "英語"]
+JH_SUBJECTS = ["國文", "數學", "社會", "自然", "藝術", "健康", "綜合", "英文"]
+GRADE_ZH = ["一年級", "二年級", "三年級", "四年級", "五年級", "六年級", "七年級", "八年級", "九年級"]
+
+PAGE_W, PAGE_H = 842, 595
+MARGIN = 30
+ROW_H = 18
+FONT_SIZE = 8
+COL_W = {"序號": 30, "科目": 70, "年級": 36, "冊別": 46, "品項": 40}
+
+
+def catalog_rows(pages, publishers=6, rows_per_page=24, seed=0):
+    """
+    產生 (表頭, 各頁資料列) 結構；回傳 header, [page_rows, ...]。
+    以年級 → 科目 → 冊別循環排列，頁數不足時循環編號以產生不重複的冊別。
+    """
+    rnd = random.Random(seed)
+    pubs = PUBLISHERS[:publishers]
+    header = ["序號", "科目", "年級", "冊別", "品項"] + pubs
+    items = []
+    n = 0
+    while len(items) * 2 < pages * rows_per_page:
+        for g in range(1, 10):
+            subjects = SUBJECTS if g <= 6 else JH_SUBJECTS
+            for s in subjects:
+                vol = f"第{g * 2 - 1 + (n % 2) + (n // 2) * 18}冊"
+                items.append((str(g), s, vol))
+        n += 1
+    page_rows = []
+    seq = 1
+    for p in range(pages):
+        rows = []
+        for (g, s, vol) in items[p * rows_per_page // 2:(p + 1) * rows_per_page // 2]:
+            for cat in ("課本", "習作"):
+                prices = []
+                for _ in pubs:
+                    v = rnd.randint(0, 3) and rnd.randint(20, 260)
+                    prices.append(rnd.choice([f"{v:03d}", f",{v}", str(v)]) if v else "-")
+                rows.append([str(seq), s, g, vol, cat] + prices)
+                seq += 1
+        page_rows.append(rows)
+    return header, page_rows
+
+
+def _pdf_text(s):
+    return "<" + "".join(f"{ord(ch):04X}" for ch in s) + ">"
+
+
+def write_pdf(path, pages=10, publishers=6, rows_per_page=24, seed=0, xobject=False):
+    """
+    寫出合成價格 PDF；回傳頁數。
+    xobject=True 時每頁內容包成一個 Form XObject，頁面串流只有 "/Fm0 Do"（常見的 PDF 產生器輸出方式）。
+    """
+    header, page_rows = catalog_rows(pages, publishers, rows_per_page, seed)
+    widths = [COL_W.get(h, 44) for h in header]
+    used = set("".join(header))
+    streams = []
+    for rows in page_rows:
+        table = [header] + rows
+        ops = ["0.5 w"]
+        top = PAGE_H - MARGIN
+        bottom = top - ROW_H * len(table)
+        x = MARGIN
+        xs = [x]
+        for w in widths:
+            x += w
+            xs.append(x)
+        for r in range(len(table) + 1):
+            y = top - r * ROW_H
+            ops.append(f"{xs[0]} {y} m {xs[-1]} {y} l S")
+        for cx in xs:
+            ops.append(f"{cx} {top} m {cx} {bottom} l S")
+        ops.append("BT")
+        for r, row in enumerate(table):
+            y = top - r * ROW_H - ROW_H + 5
+            for c, txt in enumerate(row):
+                used.update(txt)
+                ops.append(f"/F1 {FONT_SIZE} Tf 1 0 0 1 {xs[c] + 2} {y} Tm {_pdf_text(txt)} Tj")
+        ops.append("ET")
+        streams.append("\n".join(ops).encode("ascii"))
+
+    cmap = ["/CIDInit /ProcSet findresource begin 12 dict begin begincmap",
+            "/CMapName /Synth-UCS def /CMapType 2 def",
+            "1 begincodespacerange <0000> <FFFF> endcodespacerange"]
+    chars = sorted(used)
+    for i in range(0, len(chars), 100):
+        chunk = chars[i:i + 100]
+        cmap.append(f"{len(chunk)} beginbfchar")
+        cmap += [f"<{ord(ch):04X}> <{ord(ch):04X}>" for ch in chunk]
+        cmap.append("endbfchar")
+    cmap.append("endcmap CMapName currentdict /CMap defineresource pop end end")
+    cmap_data = "\n".join(cmap).encode("ascii")
+
+    # 物件編號：1 目錄、2 頁面樹、3 字型、4 子字型、5 ToUnicode、6 字型描述，其後每頁兩個物件（頁面、內容），
+    # xobject=True 時再接每頁一個 Form XObject
+    objs = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type0 /BaseFont /MingLiU /Encoding /Identity-H "
+           b"/DescendantFonts [4 0 R] /ToUnicode 5 0 R >>",
+        4: b"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /MingLiU "
+           b"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+           b"/FontDescriptor 6 0 R /DW 1000 >>",
+        5: b"<< /Length %d >>\nstream\n" % len(cmap_data) + cmap_data + b"\nendstream",
+        6: b"<< /Type /FontDescriptor /FontName /MingLiU /Flags 4 /FontBBox [0 -120 1000 880] "
+           b"/ItalicAngle 0 /Ascent 880 /Descent -120 /CapHeight 880 /StemV 80 >>",
+    }
+    kids = []
+    for i, data in enumerate(streams):
+        page_id, content_id = 7 + i * 2, 8 + i * 2
+        kids.append(f"{page_id} 0 R")
+        resources = "<< /Font << /F1 3 0 R >> >>"
+        if xobject:
+            form_id = 7 + len(streams) * 2 + i
+            objs[form_id] = (f"<< /Type /XObject /Subtype /Form /BBox [0 0 {PAGE_W} {PAGE_H}] "
+                             f"/Resources {resources} /Length {len(data)} >>\nstream\n").encode("ascii") + data + b"\nendstream"
+            resources = f"<< /XObject << /Fm0 {form_id} 0 R >> >>"
+            data = b"/Fm0 Do"
+        objs[page_id] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_W} {PAGE_H}] "
+                         f"/Resources {resources} /Contents {content_id} 0 R >>").encode("ascii")
+        objs[content_id] = b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream"
+    objs[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode("ascii")
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = {}
+    for oid in sorted(objs):
+        offsets[oid] = len(out)
+        out += b"%d 0 obj\n" % oid + objs[oid] + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    for oid in sorted(objs):
+        out += b"%010d 00000 n \n" % offsets[oid]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+    return len(streams)
+
+
+def write_selection_csv(path, publishers=6, seed=0):
+    """
+    寫出「教科書一覽表」範本格式的選用清單 CSV（科目 × 一至九年級）。
+    """
+    rnd = random.Random(seed)
+    pubs = PUBLISHERS[:publishers]
+    lines = ["教科書一覽表" + "," * len(GRADE_ZH), "科目/年級," + ",".join(GRADE_ZH)]
+    for s in ["國語/國文", "數學", "生活", "健康與體育", "自然科學", "社會", "英語", "綜合活動", "藝術"]:
+        lines.append(s + "," + ",".join(rnd.choice(pubs + [""]) for _ in GRADE_ZH))
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="產生合成價格 PDF 與選用一覽表 CSV")
+    ap.add_argument("pdf", help="輸出 PDF 路徑")
+    ap.add_argument("--pages", type=int, default=10)
+    ap.add_argument("--publishers", type=int, default=6)
+    ap.add_argument("--rows", type=int, default=24, help="每頁資料列數")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--xobject", action="store_true", help="每頁內容包成 Form XObject")
+    ap.add_argument("--csv", help="另外輸出選用一覽表 CSV 的路徑")
+    args = ap.parse_args()
+    n = write_pdf(args.pdf, args.pages, args.publishers, args.rows, args.seed, args.xobject)
+    if args.csv:
+        write_selection_csv(args.csv, args.publishers, args.seed)
+    print(f"已產生 {n} 頁：{args.pdf}")
@@ -0,0 +1,87 @@
+class Cart:
+    """
+    查詢清單：項目依加入順序保存，每項有固定編號，介面上的列以編號對應回清單。
+    項目為 {"年級", "科目", "版本", "冊別", "課本", "習作", "小計"} 字典，與匯入結果相同。
+    各年級的項目與總計隨加入、刪除同步更新，報表不必每次重新分組；
+    version 在內容改變時遞增，衍生結果（報表、表格）以 cached() 依版本快取。
+    """
+
+    def __init__(self, items=()):
+        self._items = {}
+        self._groups = {}  # 年級 → {編號: 項目}，依加入順序
+        self._totals = {}  # 年級 → 小計合計
+        self._derived = {}  # 名稱 → (版本, 結果)
+        self._next_id = 0
+        self.version = 0
+        self.extend(items)
+
+    def add(self, item):
+        """
+        加入一個項目，回傳其編號
+        """
+        item_id = self._next_id
+        self._next_id += 1
+        self._items[item_id] = item
+        grade = item["年級"]
+        self._groups.setdefault(grade, {})[item_id] = item
+        self._totals[grade] = self._totals.get(grade, 0) + item["小計"]
+        self.version += 1
+        return item_id
+
+    def extend(self, items):
+        return [self.add(item) for item in items]
+
+    def remove(self, item_ids):
+        for item_id in item_ids:
+            item = self._items.pop(item_id, None)
+            if item is None: continue
+            grade = item["年級"]
+            group = self._groups[grade]
+            del group[item_id]
+            if group:
+                self._totals[grade] -= item["小計"]
+            else:
+                del self._groups[grade], self._totals[grade]
+            self.version += 1
+
+    def clear(self):
+        self._items.clear()
+        self._groups.clear()
+        self._totals.clear()
+        self.version += 1
+
+    def get(self, item_id):
+        return self._items.get(item_id)
+
+    def items(self):
+        """
+        (編號, 項目) 依加入順序
+        """
+        return self._items.items()
+
+    def grade_groups(self):
+        """
+        年級 → 該年級的項目清單（依加入順序），與 report.group_by_grade 相同
+        """
+        return {grade: list(group.values()) for grade, group in self._groups.items()}
+
+    def grade_totals(self):
+        return dict(self._totals)
+
+    def cached(self, name, build):
+        """
+        回傳 build(self) 的結果；清單內容未改變時沿用上次的結果
+        """
+        hit = self._derived.get(name)
+        if hit is None or hit[0] != self.version:
+            hit = self._derived[name] = (self.version, build(self))
+        return hit[1]
+
+    def __iter__(self):
+        return iter(self._items.values())
+
+    def __len__(self):
+        return len(self._items)
+
+    def __bool__(self):
+        return bool(self._items)
@@ -0,0 +1,302 @@
+import os
+import pickle
+import logging
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import closing
+
+from pdf_parser import PARSER_VERSION, ParseCancelled
+
+logger = logging.getLogger(__name__)
+
+# 預設快取位置，可用環境變數 TEXTBOOK_CACHE_DIR 指定
+DEFAULT_CACHE_DIR = os.environ.get("TEXTBOOK_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".textbook_query", "cache"))
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_PAGE_CACHE_BYTES = 100 * 1024 * 1024
+# 多人共用時常駐記憶體的目錄容量上限，可用環境變數 TEXTBOOK_MEMORY_CACHE_MB 指定
+DEFAULT_MEMORY_BYTES = int(os.environ.get("TEXTBOOK_MEMORY_CACHE_MB", 512)) * 1024 * 1024
+
+
+def content_key(data, rules=None):
+    """
+    以 PDF 內容雜湊加上解析器版本作為快取鍵：檔名不同但內容相同的檔案會共用結果，
+    解析邏輯改版後舊結果自動失效。非預設的解析規則（pdf_parser.ParseRules）另加規則名稱
+    """
+    key = f"{hashlib.sha256(data).hexdigest()}-v{PARSER_VERSION}"
+    return f"{key}-{rules.name}" if rules is not None and rules.name else key
+
+
+class CatalogCache:
+    """
+    磁碟上的解析結果快取，每份價格目錄存成一個 pickle 檔。
+    超過容量上限時依最後使用時間淘汰最久未用的項目。
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".pkl")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        # 更新使用時間，作為淘汰順序依據；讀取後檔案可能已被其他程序淘汰，結果仍然有效
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        tmp = path + f".{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self.evict()
+
+    def invalidate(self, key=None):
+        """
+        移除指定項目；未指定時清空整個快取
+        """
+        keys = [key] if key else [n[:-4] for n in os.listdir(self.cache_dir) if n.endswith(".pkl")]
+        for k in keys:
+            try:
+                os.remove(self._path(k))
+            except FileNotFoundError:
+                pass
+
+    def entries(self):
+        """
+        回傳 [(鍵, 位元組數, 最後使用時間), ...]，依最後使用時間由新到舊排序
+        """
+        items = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pkl"): continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            items.append((name[:-4], st.st_size, st.st_mtime))
+        return sorted(items, key=lambda x: x[2], reverse=True)
+
+    def total_bytes(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        total = 0
+        for key, size, _ in self.entries():
+            total += size
+            if total > self.max_bytes:
+                self.invalidate(key)
+
+    def load_or_parse(self, data, parse, rules=None):
+        """
+        有快取就直接取用，否則呼叫 parse() 解析並寫入快取；rules 為 parse 使用的解析規則。
+        回傳 (鍵, 解析結果, 是否命中快取)
+        """
+        key = content_key(data, rules)
+        value = self.get(key)
+        if value is not None:
+            return key, value, True
+        value = parse()
+        self.put(key, value)
+        return key, value, False
+
+
+class _Flight:
+    """
+    進行中的解析：等待者透過它取得結果與目前進度
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.progress = None  # (已完成頁數, 總頁數)
+
+
+class SharedCatalogCache:
+    """
+    程序內共用的目錄快取（Streamlit 多人同時使用時，以 st.cache_resource 建立一份）。
+    - 以內容雜湊為鍵，各工作階段共用同一份唯讀的解析結果
+    - 同一份 PDF 同時被多人上傳時只解析一次，其他人等待並同步顯示進度
+    - 依最近使用順序保留在記憶體，超過容量上限時淘汰最久未用的；未命中時再查磁碟快取
+    """
+
+    def __init__(self, disk=None, max_bytes=DEFAULT_MEMORY_BYTES):
+        self.disk = disk
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # 鍵 → (解析結果, 估計位元組數)
+        self._flights = {}
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "waits": 0, "evictions": 0}
+
+    @staticmethod
+    def _size(value):
+        # 以序列化後大小估計記憶體用量（PriceStore 本身就是緊密陣列，兩者相近）
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _store(self, key, value, size):
+        # 呼叫時須持有 _lock；size 由 _size 在取得鎖之前算好，序列化不佔用鎖
+        self._entries[key] = (value, size)
+        self._entries.move_to_end(key)
+        total = sum(size for _, size in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, (_, size) = self._entries.popitem(last=False)
+            total -= size
+            self.stats["evictions"] += 1
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(size for _, size in self._entries.values())
+
+    def entries(self):
+        """
+        回傳 [(鍵, 估計位元組數), ...]，由最近使用到最久未用
+        """
+        with self._lock:
+            return [(key, size) for key, (_, size) in reversed(self._entries.items())]
+
+    def get(self, key):
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None: return None
+            self._entries.move_to_end(key)
+            return hit[0]
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None: self._entries.clear()
+            else: self._entries.pop(key, None)
+        if self.disk: self.disk.invalidate(key)
+
+    def load_or_parse(self, data, parse, progress=None):
+        """
+        取得解析結果，必要時呼叫 parse(progress) 解析；progress(已完成頁數, 總頁數) 在解析或等待他人解析時呼叫。
+        回傳 (鍵, 解析結果, 是否不需自行解析)
+        """
+        key = content_key(data)
+        while True:
+            with self._lock:
+                hit = self._entries.get(key)
+                if hit is not None:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return key, hit[0], True
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                else:
+                    self.stats["waits"] += 1
+            if leader:
+                value, hit = self._lead(key, flight, parse, progress)
+                return key, value, hit
+            # 等待其他工作階段的解析；定時回報進度，讓等待的一方也能被中斷（例如 Streamlit 重新執行）
+            while not flight.done.wait(0.2):
+                if progress and flight.progress: progress(*flight.progress)
+            if flight.error is None: return key, flight.value, True
+            if isinstance(flight.error, Exception) and not isinstance(flight.error, ParseCancelled): raise flight.error
+            # 負責解析的一方被中斷或取消（非一般錯誤），改由自己重新解析
+
+    def _lead(self, key, flight, parse, progress):
+        """
+        由這個工作階段負責取得結果：先查磁碟快取，沒有才解析。回傳 (解析結果, 是否來自磁碟快取)
+        """
+        def report(done, total):
+            flight.progress = (done, total)
+            if progress: progress(done, total)
+
+        try:
+            value = self.disk.get(key) if self.disk else None
+            hit = value is not None
+            if not hit:
+                value = parse(report)
+                if self.disk:
+                    # 磁碟快取只是加速：寫入失敗（磁碟已滿、權限不足）不應丟掉已解析好的結果
+                    try:
+                        self.disk.put(key, value)
+                    except OSError as e:
+                        logger.warning("無法寫入磁碟快取 %s：%s", key, e)
+            flight.value = value
+            size = self._size(value)
+            with self._lock:
+                self.stats["disk_hits" if hit else "misses"] += 1
+                self._store(key, value, size)
+            return value, hit
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+
+class PageTableCache:
+    """
+    以頁面內容雜湊（pdf_parser.page_fingerprint）為鍵的表格快取，存於單一 SQLite 檔。
+    出版社的修訂版價格表通常只改幾頁，其餘頁面可直接沿用先前擷取的表格。
+    存的是擷取出的原始表格而非解析結果：欄位對應會跨頁延續，仍需依頁序重新折疊。
+    """
+
+    def __init__(self, path=None, max_bytes=DEFAULT_PAGE_CACHE_BYTES):
+        self.path = path or os.path.join(DEFAULT_CACHE_DIR, "pages.sqlite")
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with closing(self._connect()) as con:
+            # WAL 模式下逐頁寫入不必每次都等磁碟同步，也允許同時讀取
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("CREATE TABLE IF NOT EXISTS pages (hash TEXT PRIMARY KEY, tables BLOB NOT NULL, "
+                        "size INTEGER NOT NULL, used REAL NOT NULL)")
+
+    def _connect(self):
+        # 每次操作各自連線，可在多個執行緒與程序間共用同一個檔案
+        con = sqlite3.connect(self.path, timeout=30)
+        con.execute("PRAGMA synchronous=NORMAL")
+        return con
+
+    def known(self, hashes):
+        """
+        回傳已有快取的雜湊集合，並更新它們的使用時間；每份 PDF 解析前呼叫一次，順便淘汰超量的頁面
+        """
+        found = set()
+        hashes = list(dict.fromkeys(hashes))
+        with closing(self._connect()) as con, con:
+            self._evict(con)
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                found.update(h for (h,) in con.execute(f"SELECT hash FROM pages WHERE hash IN ({marks})", chunk))
+                con.execute(f"UPDATE pages SET used = ? WHERE hash IN ({marks})", [time.time()] + chunk)
+        return found
+
+    def get(self, page_hash):
+        with closing(self._connect()) as con:
+            row = con.execute("SELECT tables FROM pages WHERE hash = ?", (page_hash,)).fetchone()
+        return None if row is None else pickle.loads(row[0])
+
+    def put(self, page_hash, tables):
+        data = pickle.dumps(tables, protocol=pickle.HIGHEST_PROTOCOL)
+        with closing(self._connect()) as con, con:
+            con.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)", (page_hash, data, len(data), time.time()))
+
+    def _evict(self, con):
+        # 超過容量上限時刪除最久未用的頁面
+        con.execute("DELETE FROM pages WHERE hash IN (SELECT hash FROM (SELECT hash, SUM(size) OVER "
+                    "(ORDER BY used DESC) AS running FROM pages) WHERE running > ?)", (self.max_bytes,))
+
+    def clear(self):
+        with closing(self._connect()) as con, con:
+            con.execute("DELETE FROM pages")
@@ -0,0 +1,101 @@
+"""
+價格異動報表：比較兩個版本的價格目錄（PDF 或編譯目錄檔），列出每個 (年級, 科目, 冊別, 類別, 版本) 的價格變動。
+新版 PDF 透過頁面表格快取解析，只有內容變動的頁面需要重新擷取表格。
+
+用法：
+  python catalog_diff.py 舊版.pdf 新版.pdf -o 價格異動.csv
+"""
+import os
+import csv
+import sys
+import argparse
+import multiprocessing
+
+import numpy as np
+
+from pdf_parser import parse_pdf, default_workers, get_subject_weight
+from catalog_cache import PageTableCache
+from catalog_file import is_catalog_file, load_catalog
+from parse_profile import ParseProfile
+from price_store import PriceStore, CATEGORIES, MISSING
+
+DIFF_COLUMNS = ["年級", "科目", "冊別", "類別", "版本", "舊價格", "新價格", "變動"]
+
+
+def _aligned_prices(store, key_ids, pub_ids):
+    """
+    將 PriceStore 的價格矩陣對齊到合併後的項目與出版社順序，store 沒有的格子為 MISSING
+    """
+    keys, pubs, raw = store.price_columns()
+    prices = np.full((len(key_ids), len(CATEGORIES), len(pub_ids)), MISSING, dtype=np.intc)
+    rows = np.fromiter((key_ids[k] for k in keys), dtype=np.intp, count=len(keys))
+    cols = np.array([pub_ids[p] for p in pubs], dtype=np.intp)
+    prices[rows[:, None, None], np.arange(len(CATEGORIES))[:, None], cols] = \
+        np.frombuffer(raw, dtype=np.intc).reshape(len(keys), len(CATEGORIES), len(pubs))
+    return prices
+
+
+def diff_catalogs(old_db, new_db):
+    """
+    回傳價格有變動的項目 [{欄位: 值}, ...]；「變動」為 調整／新增／刪除，只存在一邊的價格以空字串表示。
+    兩份目錄的價格矩陣對齊後一次比較，不逐項查詢
+    """
+    old_db, new_db = (db if isinstance(db, PriceStore) else PriceStore(db) for db in (old_db, new_db))
+    keys = list(dict.fromkeys(list(old_db) + list(new_db)))
+    pubs = list(dict.fromkeys(old_db.publishers + new_db.publishers))
+    key_ids = {k: i for i, k in enumerate(keys)}
+    pub_ids = {p: i for i, p in enumerate(pubs)}
+    old = _aligned_prices(old_db, key_ids, pub_ids)
+    new = _aligned_prices(new_db, key_ids, pub_ids)
+    rows = []
+    for i, c, p in zip(*(a.tolist() for a in np.nonzero(old != new))):
+        a, b = int(old[i, c, p]), int(new[i, c, p])
+        change = "新增" if a == MISSING else "刪除" if b == MISSING else "調整"
+        rows.append(dict(zip(DIFF_COLUMNS, (*keys[i], CATEGORIES[c], pubs[p], "" if a == MISSING else a,
+                                            "" if b == MISSING else b, change))))
+    rows.sort(key=lambda r: (int(r["年級"]) if r["年級"].isdigit() else 99, get_subject_weight(r["科目"]), r["科目"],
+                             r["冊別"], r["類別"], r["版本"]))
+    return rows
+
+
+def write_diff_csv(rows, f):
+    writer = csv.DictWriter(f, fieldnames=DIFF_COLUMNS)
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def load_any(path, workers=1, page_cache=None, profile=None):
+    """
+    讀取 PDF 或編譯目錄檔，回傳 (db, versions, index)
+    """
+    if is_catalog_file(path): return load_catalog(path)
+    return parse_pdf(path, workers=workers, page_cache=page_cache, profile=profile)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="比較兩版價格目錄的價格異動")
+    ap.add_argument("old", help="舊版價格 PDF 或編譯目錄檔")
+    ap.add_argument("new", help="新版價格 PDF 或編譯目錄檔")
+    ap.add_argument("-o", "--output", default="價格異動.csv")
+    ap.add_argument("--workers", type=int, default=default_workers(), help="PDF 解析程序數")
+    ap.add_argument("--no-page-cache", action="store_true", help="不沿用頁面表格快取，全部重新擷取")
+    args = ap.parse_args(argv)
+
+    page_cache = None if args.no_page_cache else PageTableCache()
+    old_db = load_any(args.old, args.workers, page_cache)[0]
+    profile = ParseProfile(os.path.basename(args.new))
+    new_db = load_any(args.new, args.workers, page_cache, profile)[0]
+    if profile.counters["pages"]:
+        reused = profile.counters["pages_cached"]
+        print(f"新版共 {profile.counters['pages']} 頁，重新擷取 {profile.counters['pages'] - reused} 頁，沿用 {reused} 頁")
+
+    rows = diff_catalogs(old_db, new_db)
+    with open(args.output, "w", newline="", encoding="utf-8-sig") as f:
+        write_diff_csv(rows, f)
+    counts = {c: sum(r["變動"] == c for r in rows) for c in ("調整", "新增", "刪除")}
+    print(f"價格異動 {len(rows)} 筆（調整 {counts['調整']}、新增 {counts['新增']}、刪除 {counts['刪除']}），輸出至 {args.output}")
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
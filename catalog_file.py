@@ -0,0 +1,181 @@
+"""
+編譯目錄檔（.tbcat）：把解析好的價格目錄存成單一 SQLite 檔，載入只需數毫秒，不必安裝或執行 pdfplumber。
+由管理者解析一次 PDF 後發給各校使用。
+
+檔案內容：
+  meta     格式版本、來源檔名、版本清單、編號表與索引（JSON）
+  blobs    PriceStore 的鍵與價格陣列，載入時直接還原
+  prices   (年級, 科目, 冊別, 類別, 版本, 價格) 正規化資料表，供其他工具以 SQL 查詢
+
+用法：
+  python catalog_file.py 價格.pdf -o 價格.tbcat
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import tempfile
+import multiprocessing
+from array import array
+
+from pdf_parser import PARSER_VERSION, CatalogIndex, parse_pdf, default_workers
+from price_store import PriceStore, CATEGORIES
+
+CATALOG_SUFFIX = ".tbcat"
+FORMAT_VERSION = 1
+_SQLITE_MAGIC = b"SQLite format 3\x00"
+# 載入時必須存在的 meta 欄位與陣列
+_META_FIELDS = ("byteorder", "versions", "grades", "subjects", "volumes", "pubs", "index")
+_BLOBS = ("keys", "prices")
+
+
+class CatalogFileError(ValueError):
+    """
+    不是編譯目錄檔、格式版本不支援，或內容不完整、損壞
+    """
+
+
+def is_catalog_file(name=None, data=None):
+    """
+    依副檔名或檔頭判斷是否為編譯目錄檔
+    """
+    if data is not None: return data[:len(_SQLITE_MAGIC)] == _SQLITE_MAGIC
+    return str(name).lower().endswith(CATALOG_SUFFIX)
+
+
+def save_catalog(path, db, versions, index, source=""):
+    """
+    將 (db, versions, index) 寫成編譯目錄檔；先寫暫存檔再取代，寫入中斷不會留下壞檔
+    """
+    store = db if isinstance(db, PriceStore) else PriceStore(db)
+    state = store.__getstate__()
+    meta = {
+        "format": FORMAT_VERSION,
+        "parser_version": PARSER_VERSION,
+        "source": source,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "byteorder": sys.byteorder,
+        "versions": versions,
+        "grades": state["grades"], "subjects": state["subjects"], "volumes": state["volumes"], "pubs": state["pubs"],
+        "index": index.to_state(),
+    }
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp): os.remove(tmp)
+    con = sqlite3.connect(tmp)
+    try:
+        with con:
+            con.execute("CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            con.execute("CREATE TABLE blobs (name TEXT PRIMARY KEY, typecode TEXT NOT NULL, data BLOB NOT NULL)")
+            con.execute("CREATE TABLE prices (grade TEXT, subject TEXT, volume TEXT, category TEXT, publisher TEXT, price INTEGER)")
+            con.executemany("INSERT INTO meta VALUES (?, ?)",
+                            [(k, json.dumps(v, ensure_ascii=False)) for k, v in meta.items()])
+            con.executemany("INSERT INTO blobs VALUES (?, ?, ?)",
+                            [(name, state[name].typecode, state[name].tobytes()) for name in ("keys", "prices")])
+            con.executemany("INSERT INTO prices VALUES (?, ?, ?, ?, ?, ?)", _price_rows(store))
+            con.execute("CREATE INDEX prices_key ON prices (grade, subject, volume)")
+    finally:
+        con.close()
+    os.replace(tmp, path)
+
+
+def catalog_bytes(db, versions, index, source=""):
+    """
+    編譯目錄檔的內容（供網頁下載）
+    """
+    fd, tmp = tempfile.mkstemp(suffix=CATALOG_SUFFIX)
+    os.close(fd)
+    try:
+        save_catalog(tmp, db, versions, index, source)
+        with open(tmp, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(tmp)
+
+
+def _price_rows(store):
+    for g, s, v in store:
+        res = store[(g, s, v)]
+        for cat in CATEGORIES:
+            for pub, price in res[cat].items():
+                yield g, s, v, cat, pub, price
+
+
+def _connect(source):
+    # 上傳檔為 bytes，直接載入記憶體中的資料庫；舊版 Python 不支援時改寫入暫存檔
+    if isinstance(source, (bytes, bytearray)):
+        con = sqlite3.connect(":memory:")
+        if hasattr(con, "deserialize"):
+            con.deserialize(bytes(source))
+            return con, None
+        con.close()
+        fd, tmp = tempfile.mkstemp(suffix=CATALOG_SUFFIX)
+        with os.fdopen(fd, "wb") as f:
+            f.write(source)
+        return sqlite3.connect(tmp), tmp
+    return sqlite3.connect(f"file:{os.path.abspath(source)}?mode=ro", uri=True), None
+
+
+def load_catalog(source):
+    """
+    讀取編譯目錄檔（路徑或檔案內容 bytes），回傳 (db, versions, index)，與 parse_pdf 相同
+    """
+    if isinstance(source, (bytes, bytearray)) and not is_catalog_file(data=source):
+        raise CatalogFileError("不是編譯目錄檔")
+    # 開啟與讀取都在同一個 try 內：檔案已移除、無法讀取或不是 SQLite 都一律回報 CatalogFileError
+    con = tmp = None
+    try:
+        con, tmp = _connect(source)
+        meta = {name: json.loads(value) for name, value in con.execute("SELECT name, value FROM meta")}
+        blobs = {name: (typecode, data) for name, typecode, data in con.execute("SELECT name, typecode, data FROM blobs")}
+    except (sqlite3.Error, OSError, ValueError) as e:
+        raise CatalogFileError(f"無法讀取編譯目錄檔（{e}）") from e
+    finally:
+        if con: con.close()
+        if tmp: os.remove(tmp)
+    if meta.get("format") != FORMAT_VERSION:
+        raise CatalogFileError(f"不支援的目錄檔格式版本：{meta.get('format')}")
+    missing = [name for name in _META_FIELDS if name not in meta] + [name for name in _BLOBS if name not in blobs]
+    if missing:
+        raise CatalogFileError(f"目錄檔內容不完整，缺少：{', '.join(missing)}")
+
+    arrays = {}
+    for name in _BLOBS:
+        typecode, data = blobs[name]
+        try:
+            arrays[name] = array(typecode)
+            arrays[name].frombytes(data)
+        except (TypeError, ValueError) as e:
+            raise CatalogFileError(f"目錄檔內容損壞：{name}（{e}）") from e
+        if meta["byteorder"] != sys.byteorder: arrays[name].byteswap()
+    if len(arrays["prices"]) != len(arrays["keys"]) * len(CATEGORIES) * len(meta["pubs"]):
+        raise CatalogFileError("目錄檔內容損壞：價格陣列長度與項目數不符")
+    store = PriceStore.__new__(PriceStore)
+    store.__setstate__({"grades": meta["grades"], "subjects": meta["subjects"], "volumes": meta["volumes"],
+                        "pubs": meta["pubs"], "keys": arrays["keys"], "prices": arrays["prices"]})
+    try:
+        index = CatalogIndex.from_state(meta["index"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise CatalogFileError(f"目錄檔內容損壞：index（{e}）") from e
+    return store, meta["versions"], index
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="將價格 PDF 編譯成目錄檔")
+    ap.add_argument("pdf", help="價格 PDF")
+    ap.add_argument("-o", "--output", help=f"輸出檔（預設為同名的 {CATALOG_SUFFIX}）")
+    ap.add_argument("--workers", type=int, default=default_workers(), help="PDF 解析程序數")
+    args = ap.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.pdf)[0] + CATALOG_SUFFIX
+    db, versions, index = parse_pdf(args.pdf, workers=args.workers)
+    if not db:
+        raise SystemExit("⚠️ 無法解析此 PDF。")
+    save_catalog(output, db, versions, index, source=os.path.basename(args.pdf))
+    print(f"已輸出 {output}：{len(db)} 筆項目，版本 {', '.join(versions)}")
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,134 @@
+import re
+from collections.abc import Mapping
+
+from pdf_parser import CatalogIndex
+
+
+def guess_tag(name):
+    """
+    由檔名猜測目錄標籤，例如「113學年 國小」；猜不到的部分留空
+    """
+    parts = []
+    m = re.search(r'(\d{2,3})\s*學年', name) or re.search(r'(?<!\d)(1\d{2})(?!\d)', name)
+    if m: parts.append(f"{m.group(1)}學年")
+    if "國中" in name: parts.append("國中")
+    elif "國小" in name: parts.append("國小")
+    return " ".join(parts)
+
+
+class Catalog:
+    """
+    單一價格目錄：解析結果加上來源資訊
+    """
+
+    def __init__(self, key, name, db, versions, index, tag=""):
+        self.key = key  # 目錄鍵，通常為內容雜湊（見 catalog_cache.content_key）
+        self.name = name
+        self.tag = tag or guess_tag(name)
+        self.db = db
+        self.versions = versions
+        self.index = index
+
+    @property
+    def label(self):
+        return f"{self.name}（{self.tag}）" if self.tag else self.name
+
+
+class CatalogView(Mapping):
+    """
+    多份目錄合併的唯讀檢視；同一 (年級, 科目, 冊別) 出現在多份目錄時，以先載入的為準
+    """
+
+    def __init__(self, dbs):
+        self._dbs = dbs
+        self._keys = None
+
+    @property
+    def dbs(self):
+        """
+        合併的各份目錄，依優先順序
+        """
+        return list(self._dbs)
+
+    def get(self, key, default=None):
+        for db in self._dbs:
+            res = db.get(key)
+            if res is not None: return res
+        return default
+
+    def price(self, key, cat, pub, default=0):
+        """
+        與 PriceStore.price 相同，取第一份含有該項目的目錄
+        """
+        for db in self._dbs:
+            if key in db: return db.price(key, cat, pub, default)
+        return default
+
+    def __getitem__(self, key):
+        res = self.get(key)
+        if res is None: raise KeyError(key)
+        return res
+
+    def __contains__(self, key):
+        return any(key in db for db in self._dbs)
+
+    def _all_keys(self):
+        if self._keys is None:
+            self._keys = list(dict.fromkeys(k for db in self._dbs for k in db))
+        return self._keys
+
+    def __iter__(self):
+        return iter(self._all_keys())
+
+    def __len__(self):
+        return len(self._all_keys())
+
+
+class CatalogStore:
+    """
+    同時載入多份價格目錄（國小／國中、不同地區與學年），依內容雜湊去重，
+    新檔案只需解析自己再併入；查詢與選單可依目錄篩選，不必重新解析已載入的檔案
+    """
+
+    def __init__(self):
+        self._catalogs = {}
+        self._views = {}
+
+    def __contains__(self, key):
+        return key in self._catalogs
+
+    def __iter__(self):
+        return iter(self._catalogs.values())
+
+    def __len__(self):
+        return len(self._catalogs)
+
+    def get(self, key):
+        return self._catalogs.get(key)
+
+    def add(self, catalog):
+        self._catalogs[catalog.key] = catalog
+        self._views.clear()
+
+    def remove(self, key):
+        if self._catalogs.pop(key, None) is not None:
+            self._views.clear()
+
+    def view(self, keys=None):
+        """
+        回傳所選目錄合併後的 (db, versions, index)；keys 為 None 時使用全部目錄。
+        結果依選取組合快取，切換選單不會重建索引
+        """
+        keys = tuple(k for k in (self._catalogs if keys is None else keys) if k in self._catalogs)
+        hit = self._views.get(keys)
+        if hit is None:
+            catalogs = [self._catalogs[k] for k in keys]
+            if len(catalogs) == 1:
+                c = catalogs[0]
+                hit = (c.db, c.versions, c.index)
+            else:
+                db = CatalogView([c.db for c in catalogs])
+                versions = list(dict.fromkeys(v for c in catalogs for v in c.versions))
+                hit = (db, versions, CatalogIndex(db))
+            self._views[keys] = hit
+        return hit
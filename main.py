@@ -1,9 +1,81 @@
+import time
+
+_STARTED = time.perf_counter()  # 啟動計時起點，盡量早於其他匯入
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import pdfplumber
-import re
 import csv
-from collections import defaultdict
+import os
+import sys
+import json
+import queue
+import threading
+import multiprocessing
+
+# pdf_parser 不在載入時匯入 pdfplumber，視窗顯示後才於背景載入（load_backend）
+from pdf_parser import parse_pdf, default_workers, load_backend, ParseCancelled, DESKTOP_RULES
+from catalog_cache import CatalogCache, PageTableCache, DEFAULT_CACHE_DIR
+from catalog_file import CATALOG_SUFFIX, is_catalog_file, load_catalog, save_catalog
+from parse_profile import ParseProfile, PROFILE_DIR_ENV
+from cart import Cart
+from report import group_by_grade
+
+# 使用者設定（上次開啟的目錄等）與啟動時間紀錄，和解析快取放在同一個資料夾下
+SETTINGS_PATH = os.path.join(os.path.dirname(DEFAULT_CACHE_DIR), "main_settings.json")
+STARTUP_LOG_PATH = os.path.join(os.path.dirname(DEFAULT_CACHE_DIR), "startup_times.jsonl")
+# 以 --startup-time 執行時量測啟動時間後自動結束；設定此環境變數則只記錄、不結束
+STARTUP_TIMING_ENV = "TEXTBOOK_STARTUP_TIMING"
+
+
+def load_settings():
+    try:
+        with open(SETTINGS_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_settings(settings):
+    try:
+        os.makedirs(os.path.dirname(SETTINGS_PATH), exist_ok=True)
+        with open(SETTINGS_PATH, "w", encoding="utf-8") as f:
+            json.dump(settings, f, ensure_ascii=False, indent=2)
+    except OSError:
+        pass  # 設定存不了不影響查詢
+
+
+class ButtonGrid:
+    """
+    一組單選按鈕的網格，按鈕重複使用：選項改變時只更新文字與值，多出來的按鈕隱藏，
+    不必每次點選都銷毀再重建元件
+    """
+
+    def __init__(self, parent, variable, columns, command=None, **style):
+        self.parent = parent
+        self.variable = variable
+        self.columns = columns
+        self.command = command
+        self.style = style
+        self.buttons = []
+        self.options = ()
+
+    def set_options(self, options):
+        options = tuple(options)
+        if options == self.options: return
+        for i, opt in enumerate(options):
+            if i < len(self.buttons):
+                btn = self.buttons[i]
+                btn.config(text=opt, value=opt)
+            else:
+                btn = tk.Radiobutton(self.parent, text=opt, variable=self.variable, value=opt, indicatoron=0,
+                                     font=("微軟正黑體", 9), **self.style)
+                if self.command: btn.config(command=self.command)
+                self.buttons.append(btn)
+            if i >= len(self.options):
+                btn.grid(row=i // self.columns, column=i % self.columns, padx=1, pady=1)
+        for btn in self.buttons[len(options):len(self.options)]:
+            btn.grid_remove()
+        self.options = options
 
 
 class SortedSubjectTextbookApp:
@@ -14,27 +86,49 @@ class SortedSubjectTextbookApp:
 
         # 1. 資料與變數
         self.db = {}
+        self.index = None
         self.selected_grade = tk.StringVar()
         self.selected_subject = tk.StringVar()
         self.selected_volume = tk.StringVar()
         self.selected_version = tk.StringVar()
-
-        # 定義排序優先權
-        self.sort_order = ["國語","國文", "數學", "生活", "社會", "自然", "藝術", "健體", "健康", "綜合", "英語", "英文"]
+        self.parse_workers = tk.IntVar(value=default_workers())
 
         # --- 修改點 1：版本改為動態儲存 ---
         self.versions = []
         self.ver_col_map = {}  # 紀錄版本名稱對應 PDF 的哪一欄
 
+        # 查詢清單以 Cart 為準，表格只負責顯示（列 iid 即清單項目編號）
+        self.cart = Cart()
+
+        # 背景解析：工作執行緒透過佇列回報進度與結果，由主迴圈定時取出
+        self.load_queue = queue.Queue()
+        self.load_cancel = None
+        self.catalog_cache = CatalogCache()
+        self.page_cache = PageTableCache()  # 修訂版 PDF 只重新擷取有變動的頁面
+        self.settings = load_settings()
+        self.reopen_last = tk.BooleanVar(value=self.settings.get("reopen_last", False))
+        self.parser_ready = threading.Event()
+
         self.create_widgets()
+        # 視窗先畫出來，再於背景載入 pdfplumber 與上次的目錄
+        self.root.after_idle(self._warm_up)
 
     def create_widgets(self):
         # --- 頂部：檔案選取 ---
         top_bar = tk.Frame(self.root, bg="#eeeeee", pady=3)
         top_bar.pack(fill="x")
-        tk.Button(top_bar, text="📁 載入 PDF", command=self.load_pdf, font=("微軟正黑體", 9)).pack(side="left", padx=10)
+        self.load_btn = tk.Button(top_bar, text="📁 載入 PDF", command=self.load_pdf, font=("微軟正黑體", 9))
+        self.load_btn.pack(side="left", padx=10)
         self.file_label = tk.Label(top_bar, text="請載入 PDF 價格表", fg="gray", bg="#eeeeee", font=("微軟正黑體", 9))
         self.file_label.pack(side="left")
+        # 解析中才顯示
+        self.load_progress = ttk.Progressbar(top_bar, length=160, mode="determinate")
+        self.cancel_btn = tk.Button(top_bar, text="⏹️ 取消", command=self.cancel_load, font=("微軟正黑體", 9))
+        tk.Spinbox(top_bar, from_=1, to=16, width=3, textvariable=self.parse_workers,
+                   font=("微軟正黑體", 9)).pack(side="right", padx=10)
+        tk.Label(top_bar, text="解析程序數", bg="#eeeeee", font=("微軟正黑體", 9)).pack(side="right")
+        tk.Checkbutton(top_bar, text="啟動時開啟上次目錄", variable=self.reopen_last, command=self._save_reopen_last,
+                       bg="#eeeeee", font=("微軟正黑體", 9)).pack(side="right", padx=10)
 
         # --- 主區域 ---
         main_content = tk.Frame(self.root, pady=5)
@@ -56,18 +150,22 @@ class SortedSubjectTextbookApp:
         self.f_subject.pack(fill="x", pady=2)
         self.sub_container = tk.Frame(self.f_subject)
         self.sub_container.pack(pady=2)
+        self.sub_grid = ButtonGrid(self.sub_container, self.selected_subject, 3, command=self.refresh_volumes,
+                                   width=12, selectcolor="#FFD700")
 
         # 3. 冊別
         self.f_volume = tk.LabelFrame(left_frame, text="3. 選取冊別", font=("微軟正黑體", 9))
         self.f_volume.pack(fill="x", pady=2)
         self.vol_container = tk.Frame(self.f_volume)
         self.vol_container.pack(pady=2)
+        self.vol_grid = ButtonGrid(self.vol_container, self.selected_volume, 4, width=6, selectcolor="#FFB6C1")
 
         # 4. 版本 (--- 修改點 2：改為動態容器 ---)
         self.f_version = tk.LabelFrame(left_frame, text="4. 選取版本", font=("微軟正黑體", 9))
         self.f_version.pack(fill="x", pady=2)
         self.ver_btn_container = tk.Frame(self.f_version)
         self.ver_btn_container.pack(pady=2)
+        self.ver_grid = ButtonGrid(self.ver_btn_container, self.selected_version, 4, width=8, selectcolor="#90EE90")
 
         tk.Button(left_frame, text="➕ 加入查詢清單", font=("微軟正黑體", 10, "bold"),
                   command=self.add_to_list, bg="#0078D7", fg="white", pady=5).pack(fill="x", pady=10)
@@ -89,154 +187,201 @@ class SortedSubjectTextbookApp:
         tk.Button(btn_bar, text="🗑️ 移除選取", command=self.remove_item, font=("微軟正黑體", 9)).pack(side="left",
                                                                                                       padx=2)
         tk.Button(btn_bar, text="🔄 全部清空", command=self.clear_all, font=("微軟正黑體", 9)).pack(side="left", padx=2)
+        tk.Button(btn_bar, text="💾 匯出編譯目錄", command=self.export_catalog_file,
+                  font=("微軟正黑體", 9)).pack(side="right", padx=2)
         tk.Button(btn_bar, text="📊 匯出分欄報表 (4欄/年級)", command=self.export_spaced_blocks_csv,
                   font=("微軟正黑體", 9, "bold"), bg="#27AE60", fg="white").pack(side="right", padx=5)
 
-    def get_subject_weight(self, sub_name):
-        for i, keyword in enumerate(self.sort_order):
-            if keyword in sub_name: return i
-        return 999
+    def _warm_up(self):
+        threading.Thread(target=self._warm_up_worker, daemon=True).start()
+        last = self.settings.get("last_catalog")
+        if self.reopen_last.get() and last:
+            self._start_background(self._reopen_worker, (last,), f"⏳ 開啟上次目錄：{last['name']}")
+
+    def _warm_up_worker(self):
+        try:
+            load_backend()
+        finally:
+            self.parser_ready.set()
 
-    def extract_price(self, t):
-        if not t or "-" in str(t): return 0
-        m = re.search(r'\d+', str(t).replace('\n', '').replace(',', ''))
-        return int(m.group()) if m else 0
+    def _save_reopen_last(self):
+        self.settings["reopen_last"] = self.reopen_last.get()
+        save_settings(self.settings)
 
     # --- 修改點 3：偵測 PDF 標題列並建立版本對應 ---
     def load_pdf(self):
-        file_path = filedialog.askopenfilename(filetypes=[("PDF files", "*.pdf")])
+        file_path = filedialog.askopenfilename(filetypes=[("價格目錄", f"*.pdf *{CATALOG_SUFFIX}"), ("PDF files", "*.pdf"),
+                                                          ("編譯目錄檔", f"*{CATALOG_SUFFIX}")])
         if not file_path: return
+        self.load_progress.config(value=0, maximum=1)
+        self.load_progress.pack(side="left", padx=10)
+        self.cancel_btn.pack(side="left")
+        self._start_background(self._load_worker, (file_path, max(1, self.parse_workers.get())),
+                               f"⏳ 解析中：{os.path.basename(file_path)}")
+
+    def _start_background(self, target, args, text):
+        # 解析在背景執行緒進行，視窗保持可操作；完成前沿用目前已載入的資料
+        self.load_cancel = threading.Event()
+        self.load_btn.config(state="disabled")
+        self.label_before_load = (self.file_label.cget("text"), self.file_label.cget("fg"))
+        self.file_label.config(text=text, fg="gray")
+        threading.Thread(target=target, daemon=True, args=args + (self.load_cancel,)).start()
+        self.root.after(100, self._poll_load)
+
+    def _load_worker(self, file_path, workers, cancel):
+        # 只透過佇列與主執行緒溝通，不可在此直接操作 Tk 元件
+        q = self.load_queue
+        name = os.path.basename(file_path)
         try:
-            new_db = {}
-            detected_vers = []  # 格式: [(名稱, 欄位索引), ...]
-            valid_found = False
-
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    tables = page.extract_tables()
-                    for table in tables:
-                        if not table or len(table[0]) < 4: continue
-
-                        # A. 偵測版本標題 (掃描前 10 列找出出版社名稱)
-                        if not detected_vers:
-                            # 定義您認可的版本名稱清單
-                            target_names = ["南一", "康軒", "翰林", "育成", "佳音", "何嘉仁","吉的堡","台灣培生", "全華", "龍騰", "泰宇",
-                                            "三民"]
-
-                            for r_idx in range(min(10, len(table))):
-                                row = table[r_idx]
-                                for i, cell in enumerate(row):
-                                    txt = str(cell or "").replace("\n", "").strip()
-                                    # 遍歷清單，尋找儲存格內容是否包含我們要的關鍵字
-                                    for k in target_names:
-                                        if k in txt:
-                                            v_name = k  # 直接將版本名設為清單中的關鍵字
-                                            detected_vers.append((v_name, i))
-                                            break  # 該儲存格已匹配成功，跳出關鍵字迴圈
-                                if detected_vers: break  # 該列已找到版本，跳出列掃描
-
-                        # B. 解析內容
-                        for row in table:
-                            row_str = "".join([str(c) for c in row if c])
-                            if "課本" in row_str or "習作" in row_str:
-                                if row[1] and row[2]:
-                                    valid_found = True
-                                    # 清理科目名稱
-                                    raw_s = str(row[1]).strip()
-                                    s_name = re.sub(r'^\d+\s*|\s*\d+$', '', raw_s)
-
-                                    key = (str(row[2]).strip(), s_name, str(row[3]).strip())
-                                    cat = "課" if "課本" in row_str else "習"
-
-                                    # 根據偵測到的位置存入價格字典
-                                    price_dict = {}
-                                    for v_name, col_idx in detected_vers:
-                                        if col_idx < len(row):
-                                            price_dict[v_name] = self.extract_price(row[col_idx])
-
-                                    if key not in new_db: new_db[key] = {}
-                                    if cat not in new_db[key]:
-                                        new_db[key][cat] = price_dict
-                                    else:
-                                        new_db[key][cat].update(price_dict)
-
-            if not valid_found:
-                messagebox.showerror("格式不符", "⚠️ 無法解析此 PDF。")
+            # 編譯目錄檔直接載入，不經解析與快取；下次啟動由原路徑重新開啟
+            if is_catalog_file(file_path):
+                q.put(("done", name, load_catalog(file_path), {"path": file_path}))
                 return
+            # 設定 TEXTBOOK_PROFILE_DIR 時記錄各階段耗時，報告寫入該目錄
+            profile = ParseProfile(name) if os.environ.get(PROFILE_DIR_ENV) else None
+            with open(file_path, "rb") as f:
+                data = f.read()
+            # 解析結果存入快取，同一份 PDF 再次載入或下次啟動重新開啟時不必重新解析
+            key, result, _ = self.catalog_cache.load_or_parse(
+                data, lambda: parse_pdf(file_path, workers=workers, cancel=cancel, profile=profile,
+                                        page_cache=self.page_cache, rules=DESKTOP_RULES,
+                                        progress=lambda done, total: q.put(("progress", done, total))),
+                DESKTOP_RULES)
+            if profile: profile.save()
+            q.put(("done", name, result, {"key": key}))
+        except ParseCancelled:
+            q.put(("cancelled", name))
+        except Exception as e:
+            q.put(("error", name, e))
 
-            self.db = new_db
-            self.versions = [v[0] for v in detected_vers]
-            self.refresh_version_ui()  # 更新按鈕
-            self.file_label.config(text=f"✅ 已讀取：{file_path.split('/')[-1]}", fg="#2ECC71")
-            self.refresh_subjects()
+    def _reopen_worker(self, last, cancel):
+        # 無論結果如何都要送出最後一則訊息，否則 _poll_load 會一直等待、載入按鈕無法再使用
+        result = None
+        try:
+            result = load_catalog(last["path"]) if last.get("path") else self.catalog_cache.get(last.get("key"))
+        except Exception:
+            result = None  # 檔案已移除或損壞，當作沒有上次的目錄
+        finally:
+            source = {k: last[k] for k in ("key", "path") if k in last}
+            self.load_queue.put(("reopened", last["name"], result, source) if result else ("cancelled", last["name"]))
+
+    def _poll_load(self):
+        try:
+            while True:
+                msg = self.load_queue.get_nowait()
+                if msg[0] == "progress":
+                    self.load_progress.config(value=msg[1], maximum=msg[2])
+                    self.file_label.config(text=f"⏳ 解析中：第 {msg[1]} / {msg[2]} 頁")
+                else:
+                    self._finish_load(*msg)
+                    return
+        except queue.Empty:
+            pass
+        self.root.after(100, self._poll_load)
+
+    def cancel_load(self):
+        if self.load_cancel is not None: self.load_cancel.set()
+        self.cancel_btn.config(state="disabled")
+
+    def _finish_load(self, status, name, result=None, source=None):
+        self.load_progress.pack_forget()
+        self.cancel_btn.pack_forget()
+        self.cancel_btn.config(state="normal")
+        self.load_btn.config(state="normal")
+        self.load_cancel = None
+
+        # 未成功時恢復原本的狀態列，先前載入的資料仍可繼續使用
+        text, fg = self.label_before_load
+        if status == "cancelled":
+            self.file_label.config(text=text, fg=fg)
+            return
+        if status == "error":
+            self.file_label.config(text=text, fg=fg)
+            messagebox.showerror("錯誤", f"讀取失敗：{result}")
+            return
+
+        new_db, versions, index = result
+        if not new_db:
+            self.file_label.config(text=text, fg=fg)
+            messagebox.showerror("格式不符", "⚠️ 無法解析此 PDF。")
+            return
+
+        self.db = new_db
+        self.index = index
+        self.versions = versions
+        self.refresh_version_ui()  # 更新按鈕
+        self.file_label.config(text=f"✅ 已讀取：{name}", fg="#2ECC71")
+        self.refresh_subjects()
+        self.settings["last_catalog"] = dict(source, name=name)
+        save_settings(self.settings)
+        if status == "done":
             messagebox.showinfo("偵測完成", f"已成功讀取到：{', '.join(self.versions)}")
 
-        except Exception as e:
-            messagebox.showerror("錯誤", f"讀取失敗：{e}")
-
     # --- 新增：動態生成版本按鈕 ---
     def refresh_version_ui(self):
-        for w in self.ver_btn_container.winfo_children(): w.destroy()
-        for i, v in enumerate(self.versions):
-            tk.Radiobutton(self.ver_btn_container, text=v, variable=self.selected_version, value=v,
-                           indicatoron=0, width=8, font=("微軟正黑體", 9), selectcolor="#90EE90").grid(row=i // 4,
-                                                                                                       column=i % 4,
-                                                                                                       padx=1, pady=2)
+        self.ver_grid.set_options(self.versions)
         if self.versions: self.selected_version.set(self.versions[0])
 
+    # 科目、冊別選項直接取自 CatalogIndex 預先建好的索引，點選時不必掃描 db
     def refresh_subjects(self):
-        for w in self.sub_container.winfo_children(): w.destroy()
-        grade = self.selected_grade.get()
-        if not self.db: return
-        raw_subjects = list(set([k[1] for k in self.db.keys() if k[0] == grade]))
-        sorted_subjects = sorted(raw_subjects, key=lambda x: (self.get_subject_weight(x), x))
-        for i, s_name in enumerate(sorted_subjects):
-            tk.Radiobutton(self.sub_container, text=s_name, variable=self.selected_subject, value=s_name,
-                           command=self.refresh_volumes, indicatoron=0, width=12, font=("微軟正黑體", 9),
-                           selectcolor="#FFD700").grid(row=i // 3, column=i % 3, padx=1, pady=1)
+        if not self.db: return self.sub_grid.set_options(())
+        self.sub_grid.set_options(self.index.subjects(self.selected_grade.get()))
 
     def refresh_volumes(self):
-        for w in self.vol_container.winfo_children(): w.destroy()
-        g, s_name = self.selected_grade.get(), self.selected_subject.get()
-        v_list = sorted(list(set([k[2] for k in self.db.keys() if k[0] == g and k[1] == s_name])))
-        for i, v in enumerate(v_list):
-            tk.Radiobutton(self.vol_container, text=v, variable=self.selected_volume, value=v,
-                           indicatoron=0, width=6, font=("微軟正黑體", 9), selectcolor="#FFB6C1").grid(row=i // 4,
-                                                                                                       column=i % 4,
-                                                                                                       padx=1, pady=1)
+        if not self.db: return self.vol_grid.set_options(())
+        self.vol_grid.set_options(self.index.volumes(self.selected_grade.get(), self.selected_subject.get()))
 
     # --- 修改點 4：從價格字典中取值 ---
     def add_to_list(self):
         g, s_name, vol, ver = self.selected_grade.get(), self.selected_subject.get(), self.selected_volume.get(), self.selected_version.get()
         if not all([g, s_name, vol, ver]): return
 
-        res = self.db.get((g, s_name, vol), {})
-        pb = res.get("課", {}).get(ver, 0)
-        pw = res.get("習", {}).get(ver, 0)
-        self.tree.insert("", "end", values=(f"{g}年", s_name, ver, vol, pb, pw, pb + pw))
+        key = (g, s_name, vol)
+        pb, pw = self.db.price(key, "課", ver), self.db.price(key, "習", ver)
+        self.add_items([{"年級": f"{g}年", "科目": s_name, "版本": ver, "冊別": vol, "課本": pb, "習作": pw, "小計": pb + pw}])
+
+    def add_items(self, items):
+        """
+        加入清單並一次插入表格列
+        """
+        ids = self.cart.extend(items)
+        insert = self.tree.insert
+        for item_id, it in zip(ids, items):
+            insert("", "end", iid=str(item_id),
+                   values=(it["年級"], it["科目"], it["版本"], it["冊別"], it["課本"], it["習作"], it["小計"]))
 
     def remove_item(self):
-        for item in self.tree.selection(): self.tree.delete(item)
+        selected = self.tree.selection()
+        if not selected: return
+        self.cart.remove(int(iid) for iid in selected)
+        self.tree.delete(*selected)
 
     def clear_all(self):
-        for item in self.tree.get_children(): self.tree.delete(item)
+        self.cart.clear()
+        # 一次刪除全部列，不逐列呼叫 Tk
+        self.tree.delete(*self.tree.get_children())
+
+    def export_catalog_file(self):
+        # 解析好的目錄存成編譯檔，發給其他電腦可直接載入，不必重新解析 PDF
+        if not self.db: return
+        name = os.path.splitext(self.settings.get("last_catalog", {}).get("name", "價格目錄"))[0]
+        file_path = filedialog.asksaveasfilename(defaultextension=CATALOG_SUFFIX, initialfile=name + CATALOG_SUFFIX,
+                                                 filetypes=[("編譯目錄檔", f"*{CATALOG_SUFFIX}")])
+        if not file_path: return
+        try:
+            save_catalog(file_path, self.db, self.versions, self.index, source=name)
+            messagebox.showinfo("成功", "目錄檔已匯出成功。")
+        except Exception as e:
+            messagebox.showerror("錯誤", f"匯出失敗: {e}")
 
     def export_spaced_blocks_csv(self):
-        items = self.tree.get_children()
-        if not items: return
+        if not self.cart: return
         file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV Files", "*.csv")],
                                                  initialfile="教科書費用明細表.csv")
         if not file_path: return
-        grade_groups = defaultdict(list)
-        for item in items:
-            val = self.tree.item(item)['values']
-            grade_groups[val[0]].append(val)
-
-        def g_sort(s):
-            num = re.search(r'\d+', s)
-            return int(num.group()) if num else 0
-
-        sorted_grades = sorted(grade_groups.keys(), key=g_sort)
+        # 直接由清單資料匯出，價格維持數值，不經由表格讀回字串
+        grade_groups, _ = group_by_grade(self.cart)
+        sorted_grades = sorted(grade_groups.keys(), key=lambda g: int(g.rstrip("年")))
 
         try:
             with open(file_path, mode='w', newline='', encoding='utf-8-sig') as f:
@@ -253,9 +398,9 @@ class SortedSubjectTextbookApp:
                         books = grade_groups[g]
                         if b_idx < len(books):
                             b = books[b_idx]
-                            r1 += ["科目", b[1], "課本價格", b[4]]
-                            r2 += ["版本", b[2], "習作價格", b[5]]
-                            r3 += ["冊別", b[3], "總計金額", b[6]]
+                            r1 += ["科目", b["科目"], "課本價格", b["課本"]]
+                            r2 += ["版本", b["版本"], "習作價格", b["習作"]]
+                            r3 += ["冊別", b["冊別"], "總計金額", b["小計"]]
                         else:
                             r1 += ["", "", "", ""];
                             r2 += ["", "", "", ""];
@@ -270,7 +415,37 @@ class SortedSubjectTextbookApp:
             messagebox.showerror("錯誤", f"匯出失敗: {e}")
 
 
+def report_startup_time(root, app, exit_after=False):
+    """
+    啟動時間量測：記錄視窗首次畫出與 pdfplumber 背景載入完成的時間（自 main.py 開始執行起算，
+    不含執行檔解壓縮），附加到 STARTUP_LOG_PATH 並輸出至 stderr，方便比較各版本
+    """
+    record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "frozen": getattr(sys, "frozen", False)}
+
+    def on_idle():
+        if "window" not in record: record["window"] = round(time.perf_counter() - _STARTED, 3)
+        # Tk 只能在主執行緒操作，以 after 輪詢背景載入是否完成
+        if not app.parser_ready.is_set():
+            root.after(20, on_idle)
+            return
+        record["parser_ready"] = round(time.perf_counter() - _STARTED, 3)
+        try:
+            os.makedirs(os.path.dirname(STARTUP_LOG_PATH), exist_ok=True)
+            with open(STARTUP_LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError:
+            pass
+        if sys.stderr: print(f"啟動時間：視窗 {record['window']} 秒，解析模組就緒 {record['parser_ready']} 秒", file=sys.stderr)
+        if exit_after: root.destroy()
+
+    root.after_idle(on_idle)
+
+
 if __name__ == "__main__":
+    # 打包成執行檔時，解析子程序需要此呼叫才不會重複開啟視窗
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = SortedSubjectTextbookApp(root)
+    if "--startup-time" in sys.argv or os.environ.get(STARTUP_TIMING_ENV):
+        report_startup_time(root, app, exit_after="--startup-time" in sys.argv)
     root.mainloop()
\ No newline at end of file
@@ -10,7 +10,8 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # 桌面版用不到的大型套件（Streamlit 版才需要），排除後執行檔較小、解壓較快
+    excludes=['streamlit', 'pandas', 'numpy', 'pyarrow', 'matplotlib', 'IPython', 'pytest'],
     noarchive=False,
     optimize=0,
 )
@@ -1,114 +1,226 @@
 import streamlit as st
-import pdfplumber
-import re
 import pandas as pd
-import io
-import csv
-from collections import defaultdict
+
+from pdf_parser import default_workers
+from parse_profile import ParseProfile
+from catalog_cache import CatalogCache, SharedCatalogCache, PageTableCache, content_key
+from catalog_file import CATALOG_SUFFIX, is_catalog_file, load_catalog, catalog_bytes
+from selection_import import CatalogTable, read_selection_csv, import_selection
+from catalog_store import Catalog, CatalogStore
+from report import build_report_bytes
+from cart import Cart
+from parse_job import ParseJob
+from price_compare import PublisherComparison
 
 # --- 頁面設定 ---
 st.set_page_config(page_title="教科書價格查詢系統", layout="wide")
 
-# --- 核心邏輯函數 ---
-def extract_price(t):
-    """
-    修正核心：針對國中版 PDF 內容如 "075\n" 或 ",75" 進行過濾
-    """
-    if t is None: return 0
-    # 移除所有非數字的字元（包含換行 \n、逗號、空格等）
-    cleaned = re.sub(r'[^\d]', '', str(t).strip())
-    # 轉為整數，自動處理字首 0（例如 "075" 會變成 75）
-    return int(cleaned) if cleaned else 0
+# 整個伺服器程序共用一份：同一份 PDF 只解析一次，各使用者共用同一份唯讀結果
+@st.cache_resource
+def get_catalog_cache():
+    return SharedCatalogCache(CatalogCache())
 
-def get_subject_weight(sub_name):
-    """
-    排序邏輯：讓常見科目在下拉選單中排在前面
-    """
-    sort_order = ["國語", "國文", "數學", "生活", "社會", "自然", "藝術", "健體", "健康", "綜合", "英語", "英文"]
-    for i, keyword in enumerate(sort_order):
-        if keyword in sub_name: return i
-    return 999
-
-def parse_pdf(file):
-    """
-    PDF 解析邏輯：自動偵測出版社欄位與表格內容
-    """
-    db = {}
-    detected_vers = []
-    # 擴充出版社清單，涵蓋國中小常用廠商
-    target_publishers = ["南一", "康軒", "翰林", "育成", "佳音", "何嘉仁", "吉的堡", "台灣培生", "全華", "龍騰", "泰宇", "三民"]
-    col_map = {"年級": 2, "科目": 1, "冊別": 3}
-    
-    with pdfplumber.open(file) as pdf:
-        for page in pdf.pages:
-            tables = page.extract_tables()
-            for table in tables:
-                if not table or len(table[0]) < 4: continue
-                
-                # 1. 偵測欄位索引（掃描前幾行找出年級、科目、出版社位置）
-                for r_idx in range(min(15, len(table))):
-                    row = table[r_idx]
-                    for i, cell in enumerate(row):
-                        txt = str(cell or "").replace("\n", "").strip()
-                        for k in target_publishers:
-                            if k in txt and (k, i) not in detected_vers:
-                                detected_vers.append((k, i))
-                        if "年級" in txt: col_map["年級"] = i
-                        if any(x in txt for x in ["科目", "學習領域", "學科"]): col_map["科目"] = i
-                        if "冊" in txt: col_map["冊別"] = i
-                
-                # 2. 解析資料列
-                for row in table:
-                    row_str = "".join([str(c) for c in row if c])
-                    # 判斷是否為課本或習作行
-                    if "課本" in row_str or "習作" in row_str:
-                        if row[col_map["科目"]] and row[col_map["年級"]]:
-                            # 清理科目名稱（移除數字編號與換行）
-                            raw_s = str(row[col_map["科目"]]).strip().replace("\n", "")
-                            s_name = re.sub(r'^\d+\s*|\s*\d+$', '', raw_s)
-                            
-                            # 讀取年級與冊別
-                            g_name = str(row[col_map["年級"]]).strip().replace("\n", "")
-                            v_name = str(row[col_map["冊別"]]).strip().replace("\n", "")
-                            
-                            key = (g_name, s_name, v_name)
-                            cat = "課" if "課本" in row_str else "習"
-                            
-                            price_dict = {}
-                            for ver_name, col_idx in detected_vers:
-                                if col_idx < len(row):
-                                    price_dict[ver_name] = extract_price(row[col_idx])
-                            
-                            if key not in db: db[key] = {"課": {}, "習": {}}
-                            db[key][cat].update(price_dict)
-    
-    # 依照欄位順序排列版本
-    versions = [v[0] for v in sorted(detected_vers, key=lambda x: x[1])]
-    return db, versions
+# 頁面表格快取：出版社的修訂版 PDF 只需重新擷取有變動的頁面
+@st.cache_resource
+def get_page_cache():
+    return PageTableCache()
 
 # --- 初始化 Session State ---
 if 'cart' not in st.session_state:
-    st.session_state.cart = []
+    st.session_state.cart = Cart()
 if 'db' not in st.session_state:
     st.session_state.db = None
 if 'versions' not in st.session_state:
     st.session_state.versions = []
-if 'pdf_name' not in st.session_state:
-    st.session_state.pdf_name = ""
+if 'index' not in st.session_state:
+    st.session_state.index = None
+if 'catalog_table' not in st.session_state:
+    st.session_state.catalog_table = None
+if 'catalog_store' not in st.session_state:
+    st.session_state.catalog_store = CatalogStore()
+if 'file_keys' not in st.session_state:
+    st.session_state.file_keys = {}  # 上傳檔 file_id → 內容雜湊
+if 'cancelled_file_ids' not in st.session_state:
+    st.session_state.cancelled_file_ids = set()
+if 'parse_profiles' not in st.session_state:
+    st.session_state.parse_profiles = {}  # 檔名 → 最近一次解析的 ParseProfile
+if 'comparison' not in st.session_state:
+    st.session_state.comparison = None  # (index, PublisherComparison)，所選目錄改變時重算
+if 'parse_jobs' not in st.session_state:
+    st.session_state.parse_jobs = {}  # 上傳檔 file_id → 背景解析中的 ParseJob
+if 'partial_pages' not in st.session_state:
+    st.session_state.partial_pages = {}  # 上傳檔 file_id → 已放入目錄清單的部分結果頁數
 
 # --- 側邊欄 ---
 st.sidebar.title("🛠️ 控制面板")
 
-# 1. PDF 上傳
-uploaded_pdf = st.sidebar.file_uploader("1. 載入價格 PDF ", type="pdf")
-if uploaded_pdf:
-    if uploaded_pdf.name != st.session_state.pdf_name:
-        with st.spinner("正在解析 PDF (包含個位數修正邏輯)..."):
-            db, versions = parse_pdf(uploaded_pdf)
-            st.session_state.db = db
-            st.session_state.versions = versions
-            st.session_state.pdf_name = uploaded_pdf.name
-            st.sidebar.success(f"解析完成！共有 {len(db)} 筆資料項目")
+# 1. PDF 上傳（可同時載入國小、國中、不同地區與學年的多份目錄）
+uploaded_pdfs = st.sidebar.file_uploader("1. 載入價格 PDF 或編譯目錄檔（可多選）", type=["pdf", CATALOG_SUFFIX[1:]],
+                                         accept_multiple_files=True)
+parse_workers = st.sidebar.number_input("解析程序數（大型 PDF 可調高）", min_value=1, max_value=16, value=default_workers())
+profiling = st.sidebar.checkbox("🩺 記錄解析診斷資料", help="記錄各階段耗時與每頁的表格、資料列數，解析會稍慢")
+cache = get_catalog_cache()
+store = st.session_state.catalog_store
+file_keys = st.session_state.file_keys
+jobs = st.session_state.parse_jobs
+partial_pages = st.session_state.partial_pages
+
+
+def cancel_parse(file_id):
+    st.session_state.cancelled_file_ids.add(file_id)
+    job = jobs.get(file_id)
+    if job: job.cancel()
+
+
+def drop_job(file_id):
+    # 移除背景工作，連同尚未完成的部分目錄（其他已載入的檔案內容相同時保留）
+    job = jobs.pop(file_id)
+    if partial_pages.pop(file_id, None) is not None and job.key not in file_keys.values():
+        store.remove(job.key)
+    return job
+
+
+for uploaded_pdf in uploaded_pdfs:
+    # 已載入或解析中的檔案不必重算雜湊；使用者取消過的檔案也不自動重新解析
+    if (uploaded_pdf.file_id in file_keys or uploaded_pdf.file_id in jobs
+            or uploaded_pdf.file_id in st.session_state.cancelled_file_ids): continue
+    data = uploaded_pdf.getvalue()
+    # 編譯目錄檔不需解析，直接載入
+    if is_catalog_file(uploaded_pdf.name):
+        key = content_key(data)
+        try:
+            db, versions, index = load_catalog(data)
+        except ValueError as e:
+            st.sidebar.error(f"{uploaded_pdf.name}：{e}")
+            continue
+        file_keys[uploaded_pdf.file_id] = key
+        if key not in store:
+            store.add(Catalog(key, uploaded_pdf.name, db, versions, index))
+        st.sidebar.success(f"{uploaded_pdf.name}：已載入編譯目錄！共有 {len(db)} 筆資料項目")
+        continue
+    # 在背景執行緒解析：頁面維持可操作，重新執行時沿用同一個工作，不會中斷或重新開始
+    profile = ParseProfile(uploaded_pdf.name) if profiling else None
+    jobs[uploaded_pdf.file_id] = ParseJob(uploaded_pdf.name, data, cache, parse_workers, profile,
+                                          get_page_cache()).start()
+
+# 從上傳區移除的檔案，一併停止解析並移出目錄清單
+current_ids = {f.file_id for f in uploaded_pdfs}
+for file_id in list(jobs):
+    if file_id not in current_ids:
+        drop_job(file_id).cancel()
+for file_id in list(file_keys):
+    if file_id not in current_ids:
+        key = file_keys.pop(file_id)
+        if key not in file_keys.values(): store.remove(key)
+st.session_state.cancelled_file_ids &= current_ids
+
+
+def new_partial(file_id, job):
+    """
+    尚未放入目錄清單的部分結果 (頁數, (db, versions, index))，沒有則為 None。
+    背景執行緒隨時可能更新或清除部分結果，各只讀一次再使用；
+    先讀頁數再讀結果，兩者不一致時頁數只會偏舊，下次重新執行會再更新
+    """
+    pages = job.partial_pages
+    partial = job.partial
+    if partial is None or pages == partial_pages.get(file_id): return None
+    return pages, partial
+
+
+# 收取已完成的工作；解析中的工作若有新的部分結果，先放入目錄清單供選單使用
+for file_id, job in list(jobs.items()):
+    if job.done:
+        drop_job(file_id)
+        if job.cancelled: continue
+        if job.error:
+            st.sidebar.error(f"{job.name}：解析失敗（{job.error}）")
+            continue
+        db, versions, index = job.result
+        file_keys[file_id] = job.key
+        store.add(Catalog(job.key, job.name, db, versions, index))
+        if job.profile and not job.hit:
+            st.session_state.parse_profiles[job.name] = job.profile
+            job.profile.save()
+        st.sidebar.success(f"{job.name}：{'已從快取載入' if job.hit else '解析完成'}！共有 {len(db)} 筆資料項目")
+        continue
+    partial = new_partial(file_id, job)
+    if partial:
+        pages, (db, versions, index) = partial
+        if file_id in partial_pages or job.key not in store:
+            partial_pages[file_id] = pages
+            store.add(Catalog(job.key, f"{job.name}（解析中，前 {pages} 頁）", db, versions, index))
+
+
+@st.fragment(run_every=1.0)
+def parse_progress():
+    """
+    只有這一區每秒重新執行以更新進度；工作完成或有新的部分結果時才重新執行整頁
+    """
+    for file_id, job in jobs.items():
+        done, total = job.progress
+        text = f"正在解析 {job.name}：第 {done} / {total} 頁" if total else f"正在準備解析 {job.name}…"
+        st.progress(done / total if total else 0.0, text=text)
+        st.button("⏹️ 取消解析", key=f"cancel_{file_id}", on_click=cancel_parse, args=(file_id,))
+    if any(job.done or new_partial(file_id, job) for file_id, job in jobs.items()):
+        st.rerun()
+
+
+if jobs:
+    with st.sidebar:
+        parse_progress()
+
+for uploaded_pdf in uploaded_pdfs:
+    if uploaded_pdf.file_id in st.session_state.cancelled_file_ids:
+        st.sidebar.warning(f"已取消解析 {uploaded_pdf.name}。")
+        st.sidebar.button("▶️ 重新解析", key=f"resume_{uploaded_pdf.file_id}",
+                          on_click=st.session_state.cancelled_file_ids.discard, args=(uploaded_pdf.file_id,))
+
+if profiling:
+    with st.sidebar.expander("🩺 解析診斷", expanded=True):
+        if not st.session_state.parse_profiles:
+            st.caption("尚無診斷資料；從快取載入的檔案不會重新解析，可清除快取後再解析一次。")
+        for name, profile in st.session_state.parse_profiles.items():
+            st.markdown(f"**{name}**")
+            st.dataframe(pd.DataFrame(profile.summary_rows(), columns=["項目", "數值"]), hide_index=True)
+            st.caption("最慢的頁面")
+            st.dataframe(pd.DataFrame(profile.slowest_pages()), hide_index=True)
+            st.download_button("📥 下載診斷報告 (JSON)", data=profile.to_json().encode('utf-8'),
+                               file_name=f"{name}.profile.json", mime="application/json", key=f"profile_{name}")
+
+with st.sidebar.expander("📈 共用快取狀態"):
+    stats = cache.stats
+    st.caption(f"記憶體中 {len(cache.entries())} 份目錄，約 {cache.total_bytes() / 1e6:.1f} / {cache.max_bytes / 1e6:.0f} MB")
+    st.caption(f"命中 {stats['hits']}、磁碟命中 {stats['disk_hits']}、解析 {stats['misses']}、"
+               f"等待他人解析 {stats['waits']}、淘汰 {stats['evictions']}")
+
+if len(store):
+    # 選擇查詢與匯入要使用的目錄；合併結果由 CatalogStore 快取
+    labels = {c.key: c.label for c in store}
+    selected = st.sidebar.multiselect("使用的價格目錄", list(labels), default=list(labels), format_func=labels.get)
+    with st.sidebar.expander("🏷️ 目錄標籤（來源／學年）"):
+        for c in store:
+            c.tag = st.text_input(c.name, value=c.tag, key=f"tag_{c.key}")
+    db, versions, index = store.view(selected)
+    # 選取的目錄改變，或解析中的目錄更新了部分結果時，重建匯入用的表格
+    if st.session_state.catalog_table is not None and st.session_state.catalog_table.index is not index:
+        st.session_state.catalog_table = None
+    st.session_state.db = db
+    st.session_state.versions = versions
+    st.session_state.index = index
+    # 目錄檔只在按下下載時才產生
+    source = "、".join(labels[k] for k in selected)
+    st.sidebar.download_button("💾 下載所選目錄的編譯檔", data=lambda: catalog_bytes(db, versions, index, source),
+                               file_name="價格目錄" + CATALOG_SUFFIX, mime="application/octet-stream")
+    if st.sidebar.button("🗑️ 清除所選目錄的解析快取並重新解析"):
+        for key in selected:
+            cache.invalidate(key)
+            store.remove(key)
+            for file_id in [f for f, k in file_keys.items() if k == key]: del file_keys[file_id]
+        st.rerun()
+else:
+    st.session_state.db = None
+    st.session_state.versions = []
+    st.session_state.index = None
 
 # 下載範例檔 (已更新為包含 1-9 年級的格式)
 template_csv = "教科書一覽表,,,,,,,,,\n科目/年級,一年級,二年級,三年級,四年級,五年級,六年級,七年級,八年級,九年級\n國語/國文,,,,,,,,,\n數學,,,,,,,,,\n生活,,,,,,,,,\n健康與體育,,,,,,,,,\n自然科學,,,,,,,,,\n社會,,,,,,,,,\n英語,,,,,,,,,\n綜合活動,,,,,,,,,\n藝術,,,,,,,,,\n"
@@ -120,134 +232,109 @@ if uploaded_csv and st.session_state.db:
     if st.sidebar.button("🚀 執行自動匯入"):
         try:
             raw_data = uploaded_csv.getvalue().decode('utf-8-sig')
-            df_full = pd.read_csv(io.StringIO(raw_data))
-            
-            # 自動找尋標題列
-            header_idx = 0
-            for i, row in df_full.iterrows():
-                if any("年級" in str(cell) for cell in row):
-                    header_idx = i
-                    break
-            
-            df = pd.read_csv(io.StringIO(raw_data), header=header_idx + 1)
-            # 支援國中小多種年級寫法
-            grade_cols = {
-                "一年級":"1", "二年級":"2", "三年級":"3", "四年級":"4", "五年級":"5", "六年級":"6",
-                "七年級":"7", "八年級":"8", "九年級":"9", "初一":"7", "初二":"8", "初三":"9"
-            }
-            
-            items_added = 0
-            for _, row in df.iterrows():
-                # 處理科目名稱比對 (移除斜線與空格)
-                subject_raw = str(row[0]).strip()
-                if not subject_raw or subject_raw == "nan": continue
-                
-                for g_zh, g_num in grade_cols.items():
-                    if g_zh in df.columns:
-                        version = str(row[g_zh]).strip()
-                        if version and version != "nan" and version != "":
-                            # 尋找冊別（模糊匹配科目名稱）
-                            matched_keys = [k for k in st.session_state.db.keys() if k[0] == g_num and (k[1] in subject_raw or subject_raw in k[1])]
-                            vols = sorted(list(set([k[2] for k in matched_keys])))
-                            
-                            if vols:
-                                target_vol = vols[0]
-                                actual_subject = [k[1] for k in matched_keys if k[2] == target_vol][0]
-                                
-                                res = st.session_state.db.get((g_num, actual_subject, target_vol), {})
-                                pb = res.get("課", {}).get(version, 0)
-                                pw = res.get("習", {}).get(version, 0)
-                                if pb > 0 or pw > 0:
-                                    st.session_state.cart.append({
-                                        "年級": f"{g_num}年", "科目": actual_subject, "版本": version, 
-                                        "冊別": target_vol, "課本": pb, "習作": pw, "小計": pb+pw
-                                    })
-                                    items_added += 1
+            # 目錄的表格形式只需建立一次，之後每份一覽表都以批次合併查價
+            if st.session_state.catalog_table is None:
+                st.session_state.catalog_table = CatalogTable(st.session_state.db, st.session_state.index)
+            issues = []
+            rows = import_selection(read_selection_csv(raw_data), st.session_state.catalog_table, issues)
+            st.session_state.cart.extend(rows)
+            items_added = len(rows)
             st.sidebar.success(f"匯入成功！已從「{uploaded_csv.name}」帶入 {items_added} 筆資料。")
+            if partial_pages:
+                st.sidebar.warning("部分目錄仍在解析中，尚未解析的頁面不會匯入；解析完成後可再匯入一次。")
+            # 對應不到或有多個可能的科目不自動猜測，列出來讓使用者手動加入
+            if issues:
+                st.sidebar.warning(f"有 {len(issues)} 個科目未匯入，請手動新增：\n\n"
+                                   + "\n".join(f"- {i['年級']} {i['一覽表科目']}：{i['問題']}" for i in issues))
         except Exception as e:
             st.sidebar.error(f"匯入發生錯誤：{e}")
 
 # --- 主介面 ---
+# 手動新增、查詢清單、報表匯出各為獨立的 fragment：切換選單只重新執行所在的區塊，
+# 只有清單內容改變時才重新執行整頁，讓其他區塊一併更新
 st.title("📚 教科書價格查詢系統 ")
 
-col1, col2 = st.columns([1, 2])
 
-with col1:
+@st.fragment
+def manual_add_panel():
     st.subheader("🔍 手動新增")
-    if st.session_state.db:
-        # 動態選項連動
-        grades = sorted(list(set([k[0] for k in st.session_state.db.keys()])))
-        grade = st.selectbox("選擇年級", grades)
-        
-        subjects = sorted(list(set([k[1] for k in st.session_state.db.keys() if k[0] == grade])), key=get_subject_weight)
-        subject = st.selectbox("選擇科目", subjects)
-        
-        vols = sorted(list(set([k[2] for k in st.session_state.db.keys() if k[0] == grade and k[1] == subject])))
-        vol = st.selectbox("選擇冊別", vols)
-        
-        version = st.radio("選擇版本", st.session_state.versions, horizontal=True)
-        
-        if st.button("➕ 加入清單"):
-            res = st.session_state.db.get((grade, subject, vol), {})
-            pb = res.get("課", {}).get(version, 0)
-            pw = res.get("習", {}).get(version, 0)
-            st.session_state.cart.append({"年級": f"{grade}年", "科目": subject, "版本": version, "冊別": vol, "課本": pb, "習作": pw, "小計": pb+pw})
-    else:
+    if not st.session_state.db:
         st.info("💡 請先從左側上傳價格 PDF。 ")
+        return
+    # 動態選項連動
+    index = st.session_state.index
+    grade = st.selectbox("選擇年級", index.grades)
+    subject = st.selectbox("選擇科目", index.subjects(grade))
+    vol = st.selectbox("選擇冊別", index.volumes(grade, subject))
 
-with col2:
+    version = st.radio("選擇版本", st.session_state.versions, horizontal=True)
+
+    if st.button("➕ 加入清單"):
+        key = (grade, subject, vol)
+        pb, pw = st.session_state.db.price(key, "課", version), st.session_state.db.price(key, "習", version)
+        st.session_state.cart.add({"年級": f"{grade}年", "科目": subject, "版本": version, "冊別": vol, "課本": pb, "習作": pw, "小計": pb+pw})
+        st.rerun()
+
+
+@st.fragment
+def cart_view():
     st.subheader("📋 查詢清單")
-    if st.session_state.cart:
-        df_cart = pd.DataFrame(st.session_state.cart)
-        st.dataframe(df_cart, use_container_width=True)
-        if st.button("🔄 清空清單"):
-            st.session_state.cart = []
-            st.rerun()
-    else:
+    if not st.session_state.cart:
         st.write("清單目前為空。")
+        return
+    cart = st.session_state.cart
+    # 表格與年級總計依清單版本快取，清單未改變的重新執行不必重建
+    st.dataframe(cart.cached("frame", lambda c: pd.DataFrame(list(c))), use_container_width=True)
+    st.caption("　".join(f"{g}：{total} 元" for g, total in sorted(cart.grade_totals().items())))
+    if st.button("🔄 清空清單"):
+        st.session_state.cart.clear()
+        st.rerun()
+
+
+@st.fragment
+def report_export():
+    st.divider()
+    st.subheader("📊 報表匯出")
+    # 報表只在按下下載時才產生；下載不觸發重新執行
+    cart = st.session_state.cart
+    st.download_button("💾 下載費用明細表 (CSV)",
+                       data=lambda: cart.cached("report", build_report_bytes),
+                       file_name="教科書費用明細表.csv",
+                       mime="text/csv", on_click="ignore")
+
+
+col1, col2 = st.columns([1, 2])
+with col1:
+    manual_add_panel()
+with col2:
+    cart_view()
 
 # --- 報表匯出 ---
 if st.session_state.cart:
+    report_export()
+
+
+@st.fragment
+def publisher_comparison():
     st.divider()
-    st.subheader("📊 報表匯出")
-    
-    grade_groups = defaultdict(list)
-    grade_totals = defaultdict(int)
-    for item in st.session_state.cart:
-        grade_groups[item['年級']].append(item)
-        grade_totals[item['年級']] += item['小計']
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    sorted_grades = sorted(grade_groups.keys())
-    
-    # 年級標題列
-    h_row = []
-    for g in sorted_grades: h_row += [f"【{g}】", "", "", "", ""]
-    writer.writerow(h_row)
-
-    # 總計置頂列
-    total_row = []
-    for g in sorted_grades: total_row += ["★年級總計", "", "", grade_totals[g], ""]
-    writer.writerow(total_row)
-    writer.writerow([])
-    
-    # 填充明細
-    max_b = max(len(grade_groups[g]) for g in sorted_grades)
-    for b_idx in range(max_b):
-        r1, r2, r3 = [], [], []
-        for g in sorted_grades:
-            books = grade_groups[g]
-            if b_idx < len(books):
-                b = books[b_idx]
-                r1 += ["科目", b['科目'], "課本", b['課本'], ""]
-                r2 += ["版本", b['版本'], "習作", b['習作'], ""]
-                r3 += ["冊別", b['冊別'], "小計", b['小計'], ""]
-            else:
-                r1 += [""]*5; r2 += [""]*5; r3 += [""]*5
-        writer.writerow(r1); writer.writerow(r2); writer.writerow(r3); writer.writerow([])
-        
-    st.download_button("💾 下載費用明細表 (CSV)", 
-                       data=output.getvalue().encode('utf-8-sig'), 
-                       file_name="教科書費用明細表.csv", 
-                       mime="text/csv")
+    st.subheader("⚖️ 各版本費用比較")
+    index = st.session_state.index
+    if st.session_state.comparison is None or st.session_state.comparison[0] is not index:
+        st.session_state.comparison = (index, PublisherComparison(st.session_state.db, st.session_state.versions, index))
+    comparison = st.session_state.comparison[1]
+    st.caption("每科費用為目錄中該年級各冊的課本＋習作合計；單一版本欄的總計只含該版本有出版的科目。")
+    st.dataframe(comparison.grade_summary(), hide_index=True, use_container_width=True)
+    grade = st.selectbox("比較年級", comparison.grades, format_func=lambda g: f"{g}年", key="compare_grade")
+    st.dataframe(comparison.subject_costs(grade), use_container_width=True)
+    low, high = st.columns(2)
+    with low:
+        st.markdown("**最便宜組合**")
+        st.dataframe(comparison.combination(grade), hide_index=True, use_container_width=True)
+    with high:
+        st.markdown("**最貴組合**")
+        st.dataframe(comparison.combination(grade, cheapest=False), hide_index=True, use_container_width=True)
+
+
+# 沒有辨識出任何版本欄位的目錄無從比較
+if st.session_state.db and st.session_state.versions:
+    publisher_comparison()
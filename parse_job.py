@@ -0,0 +1,86 @@
+"""
+背景解析工作：在獨立執行緒解析一份 PDF，網頁每次重新執行時只讀取目前的狀態，
+解析不會因使用者操作而中斷或重新開始；解析途中定時提供已解析頁面的部分結果。
+"""
+import io
+import threading
+
+from pdf_parser import parse_pdf, ParseCancelled
+from catalog_cache import content_key
+
+# 部分結果的更新間隔（秒）；每次更新都要重建一次目錄與索引
+PARTIAL_INTERVAL = 2.0
+
+
+class ParseJob:
+    """
+    一份 PDF 的背景解析，經由 SharedCatalogCache 取得結果（同一份內容只解析一次）。
+    狀態欄位由解析執行緒寫入、介面讀取：
+      progress       (已完成頁數, 總頁數)，尚未開始擷取時為 (0, 0)
+      partial        已解析頁面的 (db, versions, index)，尚無部分結果時為 None
+      partial_pages  partial 涵蓋的頁數
+      result, hit    完成後的 (db, versions, index) 與是否由快取取得
+      error          解析失敗或被取消時的例外
+    """
+
+    def __init__(self, name, data, cache, workers=1, profile=None, page_cache=None,
+                 partial_interval=PARTIAL_INTERVAL):
+        self.name = name
+        self.key = content_key(data)
+        self.profile = profile
+        self.progress = (0, 0)
+        self.partial = None
+        self.partial_pages = 0
+        self.result = None
+        self.hit = False
+        self.error = None
+        self._data = data
+        self._cache = cache
+        self._workers = workers
+        self._page_cache = page_cache
+        self._partial_interval = partial_interval
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"parse {name}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def cancelled(self):
+        return isinstance(self.error, ParseCancelled)
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def _report(self, done, total):
+        # 自己解析或等待其他工作階段解析時都會呼叫，取消時由此中斷
+        self.progress = (done, total)
+        if self._cancel.is_set(): raise ParseCancelled()
+
+    def _snapshot(self, result, pages):
+        self.partial = result
+        self.partial_pages = pages
+
+    def _parse(self, report):
+        return parse_pdf(io.BytesIO(self._data), workers=self._workers, progress=report, cancel=self._cancel,
+                         profile=self.profile, page_cache=self._page_cache,
+                         snapshot=self._snapshot, snapshot_interval=self._partial_interval)
+
+    def _run(self):
+        try:
+            _, self.result, self.hit = self._cache.load_or_parse(self._data, self._parse, progress=self._report)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._data = None
+            self.partial = None
+            self._done.set()
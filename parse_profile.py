@@ -0,0 +1,93 @@
+import os
+import json
+import time
+from collections import defaultdict
+
+# 設定此環境變數後，每次解析都會把診斷報告寫成 JSON 檔，方便從正式環境收集
+PROFILE_DIR_ENV = "TEXTBOOK_PROFILE_DIR"
+
+STAGE_LABELS = {
+    "open": "開啟 PDF",
+    "fingerprint": "計算頁面雜湊",
+    "extract_tables": "擷取表格",
+    "detect": "偵測欄位",
+    "rows": "解析資料列",
+    "extract_price": "價格轉換",
+    "build": "建立價格表與索引",
+    "total": "總計",
+}
+
+COUNTER_LABELS = {
+    "pages": "頁數",
+    "pages_cached": "沿用快取表格的頁數",
+    "tables": "表格數",
+    "tables_skipped": "略過的表格（欄數不足）",
+    "rows": "掃描列數",
+    "rows_matched": "課本/習作列",
+    "rows_skipped": "略過的課本/習作列（缺科目或年級）",
+    "prices": "價格儲存格",
+}
+
+
+class ParseProfile:
+    """
+    解析過程的分段計時與計數。只有在呼叫端傳入時才會記錄，未啟用時解析流程不受影響。
+    extract_price 的時間包含在 rows 之內，另外列出方便判斷瓶頸。
+    """
+
+    def __init__(self, name=""):
+        self.name = name
+        self.started = time.time()
+        self.stages = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.pages = []
+
+    def add(self, name, seconds):
+        self.stages[name] += seconds
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def page(self, page_no, **values):
+        self.pages.append(dict(page=page_no, **values))
+
+    @property
+    def total(self):
+        return self.stages.get("total", sum(v for k, v in self.stages.items() if k != "extract_price"))
+
+    def slowest_pages(self, n=5):
+        return sorted(self.pages, key=lambda p: p.get("extract_tables", 0) + p.get("parse", 0), reverse=True)[:n]
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "stages": {k: round(v, 6) for k, v in self.stages.items()},
+            "counters": dict(self.counters),
+            "pages": self.pages,
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+    def summary_rows(self):
+        """
+        [(項目, 數值), ...]，供介面顯示
+        """
+        rows = [(STAGE_LABELS.get(k, k), f"{v:.3f} 秒") for k, v in self.stages.items()]
+        rows += [(COUNTER_LABELS.get(k, k), str(v)) for k, v in self.counters.items()]
+        return rows
+
+    def save(self, directory=None):
+        """
+        寫入診斷報告；未指定目錄且未設定環境變數時不做事。回傳寫入的路徑
+        """
+        directory = directory or os.environ.get(PROFILE_DIR_ENV)
+        if not directory: return None
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started))
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in self.name) or "catalog"
+        path = os.path.join(directory, f"parse-{stamp}-{safe}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json())
+        return path
@@ -0,0 +1,574 @@
+import io
+import os
+import re
+import time
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from price_store import PriceStore
+
+# 解析規則變更時遞增，讓舊的快取結果失效
+PARSER_VERSION = 4
+
+# 擴充出版社清單，涵蓋國中小常用廠商
+TARGET_PUBLISHERS = ["南一", "康軒", "翰林", "育成", "佳音", "何嘉仁", "吉的堡", "台灣培生", "全華", "龍騰", "泰宇", "三民"]
+
+# 科目排序優先權（下拉選單與按鈕排列共用）
+SUBJECT_SORT_ORDER = ["國語", "國文", "數學", "生活", "社會", "自然", "藝術", "健體", "健康", "綜合", "英語", "英文"]
+
+
+# --- 核心邏輯函數 ---
+def extract_price(t):
+    """
+    修正核心：針對國中版 PDF 內容如 "075\n" 或 ",75" 進行過濾
+    """
+    if t is None: return 0
+    # 移除所有非數字的字元（包含換行 \n、逗號、空格等）
+    cleaned = re.sub(r'[^\d]', '', str(t).strip())
+    # 轉為整數，自動處理字首 0（例如 "075" 會變成 75）
+    return int(cleaned) if cleaned else 0
+
+
+def extract_first_price(t):
+    """
+    網頁版（app.py）與桌面版（main.py）沿用的規則：含 "-" 的儲存格為 0，否則取第一段數字，
+    例如 "120 (含CD 30)" → 120
+    """
+    if not t or "-" in str(t): return 0
+    m = re.search(r'\d+', str(t).replace('\n', '').replace(',', ''))
+    return int(m.group()) if m else 0
+
+
+# 排序關鍵字 → 科目類別：國小與國中的不同寫法歸為同一類，一覽表科目以類別對應到目錄科目
+SUBJECT_FAMILIES = {
+    "國語": "國語文", "國文": "國語文", "數學": "數學", "生活": "生活", "社會": "社會", "自然": "自然",
+    "藝術": "藝術", "健體": "健康與體育", "健康": "健康與體育", "綜合": "綜合", "英語": "英語文", "英文": "英語文",
+}
+
+
+def subject_family(sub_name):
+    """
+    科目類別：取名稱中第一個符合的排序關鍵字（與 get_subject_weight 相同），
+    例如「國語/國文」→ 國語文、「健康與體育」→ 健康與體育、「自然科學」→ 自然；都不符合時回傳 None
+    """
+    for keyword in SUBJECT_SORT_ORDER:
+        if keyword in sub_name: return SUBJECT_FAMILIES[keyword]
+    return None
+
+
+def get_subject_weight(sub_name):
+    """
+    排序邏輯：讓常見科目在下拉選單中排在前面
+    """
+    for i, keyword in enumerate(SUBJECT_SORT_ORDER):
+        if keyword in sub_name: return i
+    return 999
+
+
+def default_workers():
+    """
+    介面預設的解析程序數：最多 4 個，避免在學校主機上佔滿 CPU
+    """
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+class ParseCancelled(Exception):
+    """
+    使用者中途取消解析
+    """
+
+
+# 欄位標題關鍵字 → col_map 欄位
+HEADER_KEYWORDS = {"年級": "年級", "科目": "科目", "學習領域": "科目", "學科": "科目", "冊": "冊別"}
+
+
+# 網頁版（app.py）只認這幾個欄位標題
+APP_HEADER_KEYWORDS = {"年級": "年級", "科目": "科目", "冊": "冊別"}
+
+
+class ParseRules:
+    """
+    各介面的解析規則。三個介面原本各自解析 PDF，規則略有不同，統一解析程式後仍各自保留，
+    同一份 PDF 在各介面顯示的價格與改版前相同：
+      price            儲存格 → 價格
+      header_rows      每張表格掃描前幾列找出版社與欄位標題
+      header_keywords  欄位標題關鍵字 → col_map 欄位；None 表示固定使用預設欄位（科目 1、年級 2、冊別 3）
+      first_header     只採用第一個含出版社名稱的標題列（每格取第一個符合的出版社），之後的表格不再偵測
+      clean_newlines   科目、年級、冊別移除換行
+    name 不為空時會加在快取鍵之後，不同規則的解析結果分開快取。
+    """
+
+    def __init__(self, name="", price=extract_price, header_rows=15, header_keywords=HEADER_KEYWORDS,
+                 first_header=False, clean_newlines=True):
+        self.name = name
+        self.price = price
+        self.header_rows = header_rows
+        self.header_keywords = header_keywords
+        self.first_header = first_header
+        self.clean_newlines = clean_newlines
+
+
+# main2.py 與命令列工具
+DEFAULT_RULES = ParseRules()
+# 網頁版 app.py
+APP_RULES = ParseRules("app", price=extract_first_price, header_rows=10, header_keywords=APP_HEADER_KEYWORDS,
+                       clean_newlines=False)
+# 桌面版 main.py
+DESKTOP_RULES = ParseRules("desktop", price=extract_first_price, header_rows=10, header_keywords=None,
+                           first_header=True, clean_newlines=False)
+
+
+class HeaderDetector:
+    """
+    以單一預先編譯的規則同時比對所有出版社與欄位關鍵字。
+    相同內容的儲存格只分析一次；表頭區塊（第一筆課本/習作列之前的列）
+    依表格形狀與內容快取分析結果，同一份文件中重複出現的表頭不再重掃。
+    """
+
+    _pub_rank = {k: i for i, k in enumerate(TARGET_PUBLISHERS)}
+
+    def __init__(self, header_keywords=HEADER_KEYWORDS):
+        self._keywords = header_keywords or {}
+        # 以 lookahead 取得所有起點的比對，關鍵字彼此重疊時也不會漏掉
+        self._pattern = re.compile(
+            "(?=(" + "|".join(re.escape(k) for k in TARGET_PUBLISHERS + list(self._keywords)) + "))")
+        self._cells = {}
+        self._blocks = {}
+
+    def classify(self, cell):
+        """
+        回傳 (出版社名稱 tuple, 欄位名稱 tuple)；出版社依 TARGET_PUBLISHERS 順序
+        """
+        hit = self._cells.get(cell)
+        if hit is None:
+            txt = str(cell or "").replace("\n", "").strip()
+            found = set(self._pattern.findall(txt))
+            pubs = tuple(sorted((k for k in found if k in self._pub_rank), key=self._pub_rank.get))
+            cols = tuple(dict.fromkeys(self._keywords[k] for k in self._keywords if k in found))
+            hit = self._cells[cell] = (pubs, cols)
+        return hit
+
+    def scan(self, rows):
+        """
+        掃描多列，回傳 ([(出版社, 欄位索引), ...], {欄位: 索引})，後出現的欄位標題覆蓋先前的
+        """
+        pub_hits, col_hits = [], {}
+        for row in rows:
+            for i, cell in enumerate(row):
+                pubs, cols = self.classify(cell)
+                for k in pubs: pub_hits.append((k, i))
+                for c in cols: col_hits[c] = i
+        return pub_hits, col_hits
+
+    def scan_header(self, rows):
+        key = (len(rows[0]), tuple(tuple(r) for r in rows)) if rows else None
+        hit = self._blocks.get(key)
+        if hit is None:
+            hit = self._blocks[key] = self.scan(rows)
+        return hit
+
+
+class CatalogBuilder:
+    """
+    逐張表格累積解析結果。欄位偵測結果會延續到後續表格，
+    因此表格必須依頁面順序餵入，結果才會與逐頁解析一致。
+    """
+
+    def __init__(self, profile=None, rules=DEFAULT_RULES):
+        self.db = {}
+        self.profile = profile  # ParseProfile，None 表示不記錄
+        self.rules = rules
+        self.detected_vers = []
+        self._detected_set = set()
+        self.col_map = {"年級": 2, "科目": 1, "冊別": 3}
+        self.detector = HeaderDetector(rules.header_keywords)
+
+    def _apply(self, pub_hits, col_hits):
+        for hit in pub_hits:
+            if hit not in self._detected_set:
+                self._detected_set.add(hit)
+                self.detected_vers.append(hit)
+        self.col_map.update(col_hits)
+
+    def _detect_first_header(self, rows):
+        # 桌面版規則：找到第一個含出版社名稱的列就停止，之後的表格沿用
+        if self.detected_vers: return
+        for row in rows:
+            self._apply([(pubs[0], i) for i, pubs in enumerate(self.detector.classify(c)[0] for c in row) if pubs], {})
+            if self.detected_vers: return
+
+    def _timed_price(self, t):
+        start = time.perf_counter()
+        price = self.rules.price(t)
+        self.profile.add("extract_price", time.perf_counter() - start)
+        self.profile.count("prices")
+        return price
+
+    def feed_table(self, table):
+        """
+        解析一張表格並併入 db，回傳本表解析出的資料列 [(key, 類別, {版本: 價格}), ...]
+        """
+        rows = []
+        profile = self.profile
+        if profile: profile.count("tables")
+        if not table or len(table[0]) < 4:
+            if profile: profile.count("tables_skipped")
+            return rows
+        started = time.perf_counter() if profile else 0
+        rules, col_map, db = self.rules, self.col_map, self.db
+        row_strs = ["".join([str(c) for c in row if c]) for row in table]
+        is_data = ["課本" in r or "習作" in r for r in row_strs]
+
+        # 1. 偵測欄位索引（掃描前幾行找出年級、科目、出版社位置）
+        #    表頭區塊整塊快取；視窗內其餘的列仍逐格檢查，結果與逐格掃描完全相同
+        window = min(rules.header_rows, len(table))
+        if rules.first_header:
+            self._detect_first_header(table[:window])
+        else:
+            n_header = next((i for i in range(window) if is_data[i]), window)
+            self._apply(*self.detector.scan_header(table[:n_header]))
+            self._apply(*self.detector.scan(table[n_header:window]))
+        detected_vers = self.detected_vers
+        if profile:
+            detected = time.perf_counter()
+            profile.add("detect", detected - started)
+            price_of = self._timed_price
+        else:
+            price_of = rules.price
+        newline = "" if rules.clean_newlines else "\n"
+
+        # 2. 解析資料列
+        for row, row_str, data in zip(table, row_strs, is_data):
+            # 判斷是否為課本或習作行
+            if data:
+                if row[col_map["科目"]] and row[col_map["年級"]]:
+                    # 清理科目名稱（移除數字編號與換行）
+                    raw_s = str(row[col_map["科目"]]).strip().replace("\n", newline)
+                    s_name = re.sub(r'^\d+\s*|\s*\d+$', '', raw_s)
+
+                    # 讀取年級與冊別
+                    g_name = str(row[col_map["年級"]]).strip().replace("\n", newline)
+                    v_name = str(row[col_map["冊別"]]).strip().replace("\n", newline)
+
+                    key = (g_name, s_name, v_name)
+                    cat = "課" if "課本" in row_str else "習"
+
+                    price_dict = {}
+                    for ver_name, col_idx in detected_vers:
+                        if col_idx < len(row):
+                            price_dict[ver_name] = price_of(row[col_idx])
+
+                    if key not in db: db[key] = {"課": {}, "習": {}}
+                    db[key][cat].update(price_dict)
+                    rows.append((key, cat, price_dict))
+                elif profile:
+                    profile.count("rows_skipped")
+        if profile:
+            profile.add("rows", time.perf_counter() - detected)
+            profile.count("rows", len(table))
+            profile.count("rows_matched", len(rows))
+        return rows
+
+    def result(self):
+        # 依照欄位順序排列版本
+        versions = [v[0] for v in sorted(self.detected_vers, key=lambda x: x[1])]
+        # 解析期間以字典累積，完成後轉成壓縮的 PriceStore
+        store = PriceStore(self.db)
+        return store, versions, CatalogIndex(store)
+
+
+class CatalogIndex:
+    """
+    年級 → 科目 → 冊別 的預先排序索引，讓連動選單與匯入比對不必每次掃描整個 db
+    """
+
+    def __init__(self, db):
+        tree = {}
+        for g, s, v in db:
+            tree.setdefault(g, {}).setdefault(s, []).append(v)
+        self.grades = sorted(tree)
+        # 科目依 get_subject_weight 排序，同權重再依名稱排序
+        self._subjects = {g: sorted(subs, key=lambda x: (get_subject_weight(x), x)) for g, subs in tree.items()}
+        self._volumes = {(g, s): sorted(set(vs)) for g, subs in tree.items() for s, vs in subs.items()}
+        self._build_families()
+
+    def _build_families(self):
+        # (年級, 科目類別) → 該年級屬於此類別的目錄科目，匯入時以此對應一覽表科目
+        self._families = {}
+        for g, subs in self._subjects.items():
+            for s in subs:
+                family = subject_family(s)
+                if family: self._families.setdefault((g, family), []).append(s)
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        由 to_state() 的結果還原（編譯目錄檔載入用），不必重新掃描 db
+        """
+        index = cls.__new__(cls)
+        index.grades = state["grades"]
+        index._subjects = state["subjects"]
+        index._volumes = {(g, s): vs for g, s, vs in state["volumes"]}
+        index._build_families()
+        return index
+
+    def to_state(self):
+        """
+        可存成 JSON 的索引內容
+        """
+        return {"grades": self.grades, "subjects": self._subjects,
+                "volumes": [[g, s, vs] for (g, s), vs in self._volumes.items()]}
+
+    def subjects(self, grade):
+        return self._subjects.get(grade, [])
+
+    def volumes(self, grade, subject):
+        return self._volumes.get((grade, subject), [])
+
+    def resolve_subject(self, grade, name):
+        """
+        將一覽表上的科目名稱對應到該年級的目錄科目，回傳 (科目, 候選科目)：
+        名稱完全相同者優先，否則依科目類別對應；找不到時科目為 None、候選為空，
+        同類別有多個科目時科目為 None、候選列出所有可能，由呼叫端回報而不猜測
+        """
+        if (grade, name) in self._volumes: return name, [name]
+        family = subject_family(name)
+        candidates = self._families.get((grade, family), []) if family else []
+        return (candidates[0] if len(candidates) == 1 else None), candidates
+
+
+# --- 頁面表格擷取（可分派至多個程序） ---
+def _pdf_source(file):
+    """
+    轉成可傳給子程序的來源：路徑維持原樣，檔案物件（如 Streamlit 上傳檔）讀成 bytes
+    """
+    if isinstance(file, (str, os.PathLike)): return file
+    if hasattr(file, "getvalue"): return file.getvalue()
+    file.seek(0)
+    return file.read()
+
+
+def load_backend():
+    """
+    載入 pdfplumber（連同 pdfminer），第一次需要數百毫秒。
+    模組載入時不匯入，介面可先顯示，再於背景呼叫本函式預先載入
+    """
+    import pdfplumber
+    return pdfplumber
+
+
+def _open_source(source):
+    return load_backend().open(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+
+def page_fingerprint(page):
+    """
+    頁面內容雜湊：解壓後的內容串流、字型的文字對照表、內容串流以 Do 繪製的 XObject（遞迴包含其資源）
+    與頁面尺寸（加上 pdfplumber 版本）。修訂版 PDF 中沒有變動的頁面雜湊相同，可沿用先前擷取的表格
+    """
+    from pdfminer.pdftypes import resolve1
+    obj = page.page_obj
+    h = hashlib.sha256(f"{load_backend().__version__}|{page.bbox}".encode())
+    for stream in obj.contents:
+        h.update(resolve1(stream).get_data())
+    _hash_resources(h, obj.resources, set())
+    return h.hexdigest()
+
+
+def _hash_resources(h, resources, seen):
+    # 許多 PDF 產生器把整頁內容包成一個 Form XObject（頁面串流只有 "/Fm0 Do"），
+    # 因此 XObject 的內容與它自己的字型、XObject 也必須納入雜湊；seen 避免循環參照
+    from pdfminer.pdftypes import resolve1
+    resources = resolve1(resources) or {}
+    fonts = resolve1(resources.get("Font")) or {}
+    for name in sorted(fonts):
+        font = resolve1(fonts[name])
+        to_unicode = resolve1(font.get("ToUnicode")) if isinstance(font, dict) else None
+        h.update(f"F|{name}".encode())
+        if hasattr(to_unicode, "get_data"): h.update(to_unicode.get_data())
+    xobjects = resolve1(resources.get("XObject")) or {}
+    for name in sorted(xobjects):
+        ref = xobjects[name]
+        xobj = resolve1(ref)
+        h.update(f"X|{name}".encode())
+        if not hasattr(xobj, "get_data"): continue
+        key = getattr(ref, "objid", None) or id(xobj)
+        if key in seen: continue
+        seen.add(key)
+        if getattr(xobj.get("Subtype"), "name", None) == "Form":
+            h.update(str(resolve1(xobj.get("BBox"))).encode())
+            h.update(str(resolve1(xobj.get("Matrix"))).encode())
+            h.update(xobj.get_data())
+            _hash_resources(h, xobj.get("Resources"), seen)
+        else:
+            # 圖片不需解碼，以原始資料區分即可
+            h.update(xobj.get_rawdata() or b"")
+
+
+def page_fingerprints(file):
+    """
+    各頁的內容雜湊（依頁序）
+    """
+    with _open_source(_pdf_source(file)) as pdf:
+        return [page_fingerprint(page) for page in pdf.pages]
+
+
+_worker_source = None
+
+
+def _init_worker(source):
+    # 每個子程序只接收一次 PDF 內容，避免每段頁面都重複傳送整份檔案
+    global _worker_source
+    _worker_source = source
+
+
+def _extract_pages(page_indexes):
+    """
+    子程序工作：擷取指定頁（從 0 起算）的表格，回傳 (開檔秒數, [(該頁表格清單, 擷取秒數), ...])
+    """
+    t = time.perf_counter()
+    with _open_source(_worker_source) as pdf:
+        pages = [pdf.pages[i] for i in page_indexes]
+        opened = time.perf_counter() - t
+        return opened, [_extract_and_release(page) for page in pages]
+
+
+def _extract_and_release(page):
+    # pdfplumber 會在頁面物件上快取字元與版面物件，擷取完立即釋放，記憶體才不會隨頁數成長
+    t = time.perf_counter()
+    tables = page.extract_tables()
+    page.close()
+    return tables, time.perf_counter() - t
+
+
+def _record_page(profile, page_no, tables, seconds):
+    if profile is None: return
+    profile.add("extract_tables", seconds)
+    profile.count("pages")
+    profile.page(page_no, extract_tables=round(seconds, 6), tables=len(tables))
+
+
+def iter_page_tables(file, workers=1, profile=None, page_cache=None):
+    """
+    依頁面順序逐頁產生 (頁碼, 總頁數, 該頁表格清單)，頁碼從 1 開始。
+    workers > 1 時以程序池平行擷取，每個子程序負責一段頁面
+    （此時各階段秒數為各程序累計，可能大於實際經過時間）。
+    page_cache（如 catalog_cache.PageTableCache）可依頁面內容雜湊沿用先前擷取的表格，
+    修訂版 PDF 只需擷取有變動的頁面。
+    """
+    source = _pdf_source(file)
+    t = time.perf_counter()
+    with _open_source(source) as pdf:
+        n_pages = len(pdf.pages)
+        if profile: profile.add("open", time.perf_counter() - t)
+        hashes, known = [None] * n_pages, set()
+        if page_cache is not None:
+            t = time.perf_counter()
+            hashes = [page_fingerprint(page) for page in pdf.pages]
+            known = page_cache.known(hashes)
+            if profile: profile.add("fingerprint", time.perf_counter() - t)
+        todo = [i for i in range(n_pages) if hashes[i] not in known]
+        if workers <= 1 or len(todo) < 2:
+            for i, page in enumerate(pdf.pages):
+                if hashes[i] in known:
+                    tables = _cached_tables(page_cache, hashes[i], profile, i + 1)
+                    if tables is not None:
+                        yield i + 1, n_pages, tables
+                        continue
+                tables, seconds = _extract_and_release(page)
+                _record_page(profile, i + 1, tables, seconds)
+                if page_cache is not None: page_cache.put(hashes[i], tables)
+                yield i + 1, n_pages, tables
+            return
+
+    # 切成比程序數多幾倍的區段，讓較慢的頁面不會拖住整批
+    n_chunks = min(len(todo), workers * 4)
+    bounds = [len(todo) * i // n_chunks for i in range(n_chunks + 1)]
+    ctx = multiprocessing.get_context("spawn")
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(source,))
+    try:
+        futures = [pool.submit(_extract_pages, todo[bounds[i]:bounds[i + 1]]) for i in range(n_chunks)]
+
+        def extracted():
+            for fut in futures:
+                opened, pages = fut.result()
+                if profile: profile.add("open", opened)
+                yield from pages
+
+        results = extracted()
+        for i in range(n_pages):
+            if hashes[i] in known:
+                tables = _cached_tables(page_cache, hashes[i], profile, i + 1)
+                if tables is not None:
+                    yield i + 1, n_pages, tables
+                    continue
+                # known() 之後被其他工作階段淘汰，這一頁不在程序池的工作中，改在本程序直接擷取
+                with _open_source(source) as pdf:
+                    tables, seconds = _extract_and_release(pdf.pages[i])
+            else:
+                tables, seconds = next(results)
+            _record_page(profile, i + 1, tables, seconds)
+            if page_cache is not None: page_cache.put(hashes[i], tables)
+            yield i + 1, n_pages, tables
+    finally:
+        # 中途停止（取消或例外）時丟棄尚未開始的區段，不等它們跑完
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _cached_tables(page_cache, page_hash, profile, page_no):
+    """
+    取出快取的表格；已被淘汰時回傳 None，由呼叫端改為重新擷取
+    """
+    tables = page_cache.get(page_hash)
+    if tables is None: return None
+    if profile:
+        profile.count("pages")
+        profile.count("pages_cached")
+        profile.page(page_no, extract_tables=0, tables=len(tables), cached=True)
+    return tables
+
+
+def iter_parse_pdf(file, builder, workers=1, page_cache=None):
+    """
+    串流解析：每處理完一頁就產生 (頁碼, 總頁數, 該頁解析出的資料列)，結果同時累積在 builder。
+    呼叫端可隨時停止迭代，PDF 會隨產生器關閉。
+    """
+    profile = builder.profile
+    for page_no, n_pages, tables in iter_page_tables(file, workers, profile, page_cache):
+        t = time.perf_counter()
+        rows = []
+        for table in tables:
+            rows += builder.feed_table(table)
+        if profile: profile.pages[-1].update(parse=round(time.perf_counter() - t, 6), rows=len(rows))
+        yield page_no, n_pages, rows
+
+
+def parse_pdf(file, workers=1, progress=None, cancel=None, profile=None, page_cache=None,
+              snapshot=None, snapshot_interval=2.0, rules=DEFAULT_RULES):
+    """
+    PDF 解析邏輯：自動偵測出版社欄位與表格內容。
+    workers > 1 時平行擷取頁面表格，再依頁序合併，結果與逐頁解析相同。
+    progress(已完成頁數, 總頁數) 於每頁完成後呼叫；cancel 為 threading.Event 之類的物件，
+    被設定時拋出 ParseCancelled。profile 為 ParseProfile 時記錄各階段與各頁的時間與計數。
+    page_cache 用法見 iter_page_tables。
+    snapshot(部分結果, 已完成頁數) 於解析途中至多每 snapshot_interval 秒呼叫一次，
+    部分結果為已解析頁面的 (db, versions, index)，供背景解析時先行查詢。
+    rules 為各介面的解析規則（見 ParseRules）。
+    回傳 (db, versions, index)，db 為 PriceStore，index 為 CatalogIndex。
+    """
+    started = last_snapshot = time.perf_counter()
+    builder = CatalogBuilder(profile, rules)
+    for page_no, n_pages, _ in iter_parse_pdf(file, builder, workers, page_cache):
+        if progress: progress(page_no, n_pages)
+        if cancel is not None and cancel.is_set():
+            raise ParseCancelled()
+        if snapshot and page_no < n_pages and time.perf_counter() - last_snapshot >= snapshot_interval:
+            snapshot(builder.result(), page_no)
+            last_snapshot = time.perf_counter()
+    t = time.perf_counter()
+    result = builder.result()
+    if profile:
+        profile.add("build", time.perf_counter() - t)
+        profile.add("total", time.perf_counter() - started)
+    return result
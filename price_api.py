@@ -0,0 +1,172 @@
+"""
+本機價格查詢 API：載入一份價格目錄後，以 HTTP/JSON 提供單筆與批次查價，供採購試算表等工具呼叫。
+
+  GET  /health
+  GET  /catalog                                   版本清單與各年級科目
+  GET  /price?grade=1&subject=國語&volume=第1冊&publisher=南一
+  POST /prices   {"items": [{"grade": "1", "subject": "國語", "volume": "第1冊", "publisher": "南一"}, ...]}
+
+查價結果：{"grade", "subject", "volume", "publisher", "found", "textbook", "workbook", "subtotal"}
+單筆查價在目錄中找不到時回傳 404（內容同上，found 為 false）；批次查價則逐筆以 found 表示
+
+用法：
+  python price_api.py 價格.pdf --port 8765
+"""
+import sys
+import json
+import argparse
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from pdf_parser import parse_pdf, default_workers
+from catalog_cache import CatalogCache
+
+FIELDS = ("grade", "subject", "volume", "publisher")
+# 批次查詢的筆數上限，避免單一請求占住伺服器
+MAX_BATCH = 10000
+# 批次查詢的請求內容上限（位元組）；MAX_BATCH 筆查詢遠小於此值
+MAX_BODY_BYTES = 4 * 1024 * 1024
+
+
+class InvalidQuery(ValueError):
+    """
+    查詢欄位不完整
+    """
+
+
+class PriceService:
+    """
+    查價邏輯（與介面相同：以 db.price 查 (年級, 科目, 冊別) 的「課」「習」），不含 HTTP 部分，可直接呼叫
+    """
+
+    def __init__(self, db, versions, index):
+        self.db = db
+        self.versions = versions
+        self.index = index
+
+    def lookup(self, item):
+        missing = [f for f in FIELDS if not str(item.get(f, "")).strip()]
+        if missing: raise InvalidQuery(f"缺少欄位：{', '.join(missing)}")
+        # 年級接受 1、"1"、"1年"
+        g = str(item["grade"]).strip().rstrip("年")
+        s, v, pub = (str(item[f]).strip() for f in FIELDS[1:])
+        # 以 None 區分「沒有這一格」與價格 0
+        pb, pw = (self.db.price((g, s, v), cat, pub, None) for cat in ("課", "習"))
+        return {"grade": g, "subject": s, "volume": v, "publisher": pub,
+                "found": pb is not None or pw is not None,
+                "textbook": pb or 0, "workbook": pw or 0, "subtotal": (pb or 0) + (pw or 0)}
+
+    def lookup_many(self, items):
+        """
+        批次查價；單筆欄位不完整時該筆回傳 error，不影響其他筆
+        """
+        results = []
+        for item in items:
+            try:
+                results.append(self.lookup(item))
+            except (InvalidQuery, AttributeError) as e:
+                results.append({"error": str(e) if isinstance(e, InvalidQuery) else "每筆須為物件"})
+        return results
+
+    def catalog(self):
+        return {"versions": self.versions, "items": len(self.db),
+                "grades": {g: self.index.subjects(g) for g in self.index.grades}}
+
+
+class PriceRequestHandler(BaseHTTPRequestHandler):
+    server_version = "TextbookPriceAPI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet: super().log_message(format, *args)
+
+    def _send(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        service = self.server.service
+        if url.path == "/health":
+            return self._send(200, {"status": "ok"})
+        if url.path == "/catalog":
+            return self._send(200, service.catalog())
+        if url.path == "/price":
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            try:
+                result = service.lookup(query)
+            except InvalidQuery as e:
+                return self._send(400, {"error": str(e)})
+            return self._send(200 if result["found"] else 404, result)
+        self._send(404, {"error": "找不到此路徑"})
+
+    def do_POST(self):
+        if urlsplit(self.path).path != "/prices":
+            return self._send(404, {"error": "找不到此路徑"})
+        # 長度不合法時不讀取內容：負值會讓 rfile.read 一直等待到連線關閉；回應後關閉連線，避免殘留內容被當成下一個請求
+        try:
+            length = int(self.headers["Content-Length"])
+        except (TypeError, ValueError):
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            return self._send(400, {"error": "缺少或不合法的 Content-Length"})
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            return self._send(413, {"error": f"請求內容最多 {MAX_BODY_BYTES} 位元組"})
+        try:
+            body = json.loads(self.rfile.read(length).decode("utf-8") or "null")
+        except (ValueError, UnicodeDecodeError):
+            return self._send(400, {"error": "請求內容須為 JSON"})
+        items = body.get("items") if isinstance(body, dict) else body
+        if not isinstance(items, list):
+            return self._send(400, {"error": "請以 {\"items\": [...]} 或陣列傳送查詢"})
+        if len(items) > MAX_BATCH:
+            return self._send(413, {"error": f"單次最多 {MAX_BATCH} 筆"})
+        self._send(200, {"results": self.server.service.lookup_many(items)})
+
+
+def make_server(service, host="127.0.0.1", port=8765, quiet=False):
+    """
+    建立伺服器（每個連線一個執行緒）；port=0 時由系統分配，實際埠號見 server.server_address
+    """
+    server = ThreadingHTTPServer((host, port), PriceRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.quiet = quiet
+    return server
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="教科書價格查詢 API")
+    ap.add_argument("pdf", help="價格 PDF")
+    ap.add_argument("--host", default="127.0.0.1", help="預設只接受本機連線")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=default_workers(), help="PDF 解析程序數")
+    ap.add_argument("--quiet", action="store_true", help="不輸出每筆請求紀錄")
+    args = ap.parse_args(argv)
+
+    with open(args.pdf, "rb") as f:
+        data = f.read()
+    _, (db, versions, index), _ = CatalogCache().load_or_parse(data, lambda: parse_pdf(args.pdf, workers=args.workers))
+    if not db:
+        raise SystemExit("⚠️ 無法解析此 PDF。")
+    server = make_server(PriceService(db, versions, index), args.host, args.port, args.quiet)
+    print(f"價格目錄：{len(db)} 筆項目，版本 {', '.join(versions)}")
+    print(f"服務位址：http://{args.host}:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+各版本費用比較：以整份價格目錄一次算出每個 (年級, 科目, 出版社) 的課本＋習作費用，
+以及各年級每科都選最便宜／最貴版本時的組合與總計。
+計算以 numpy 矩陣批次進行，完整的國中小目錄也只需數毫秒，介面切換年級不必重算。
+"""
+import numpy as np
+import pandas as pd
+
+from pdf_parser import CatalogIndex
+from price_store import PriceStore, CATEGORIES, MISSING
+
+
+class PublisherComparison:
+    """
+    costs[i, p]：第 i 個 (年級, 科目) 由出版社 p 供應時的費用（該科目錄中各冊的課本＋習作合計），
+    出版社缺任何一冊時為 NaN。PDF 中「-」或空白的格子解析為 0，因此課本與習作都不大於 0 的冊
+    視為未供應；只缺其中一項時以 0 計，與自動匯入（課本或習作 > 0 才匯入）相同。
+    """
+
+    def __init__(self, db, versions=None, index=None):
+        store = db if isinstance(db, PriceStore) else PriceStore(db)
+        index = index or CatalogIndex(store)
+        keys, pubs, raw = store.price_columns()
+        # 出版社依目錄欄位順序，目錄中沒有價格的版本不列入
+        self.publishers = [p for p in versions or pubs if p in pubs]
+        order = np.array([pubs.index(p) for p in self.publishers], dtype=np.intp)
+
+        # (年級, 科目) 依介面選單順序編號
+        self.groups = [(g, s) for g in index.grades for s in index.subjects(g)]
+        self.grades = list(index.grades)
+        group_ids = {gs: i for i, gs in enumerate(self.groups)}
+        grade_ids = {g: i for i, g in enumerate(self.grades)}
+        item_group = np.fromiter((group_ids[(g, s)] for g, s, _ in keys), dtype=np.intp, count=len(keys))
+        self._group_grade = np.fromiter((grade_ids[g] for g, _ in self.groups), dtype=np.intp, count=len(self.groups))
+
+        prices = np.frombuffer(raw, dtype=np.intc).reshape(len(keys), len(CATEGORIES), len(pubs))[:, :, order]
+        missing = prices == MISSING
+        prices = np.where(missing, 0, prices)
+        item_costs = prices.sum(axis=1)
+        item_offered = (prices > 0).any(axis=1)
+
+        # 同一 (年級, 科目) 的各冊加總；出版社必須每冊都有價格才算有供應
+        n_groups = len(self.groups)
+        costs = np.zeros((n_groups, len(self.publishers)))
+        offered = np.zeros((n_groups, len(self.publishers)), dtype=np.intp)
+        np.add.at(costs, item_group, item_costs)
+        np.add.at(offered, item_group, item_offered)
+        volumes = np.bincount(item_group, minlength=n_groups)
+        self.costs = np.where(offered == volumes[:, None], costs, np.nan)
+
+        # 每科最便宜／最貴的出版社，沒有任何出版社供應的科目不列入組合
+        available = ~np.isnan(self.costs)
+        self._has_offer = available.any(axis=1)
+        rows = np.arange(n_groups)
+        if self.publishers:
+            self._cheapest = np.where(available, self.costs, np.inf).argmin(axis=1)
+            self._priciest = np.where(available, self.costs, -np.inf).argmax(axis=1)
+            self._min_costs = np.where(self._has_offer, self.costs[rows, self._cheapest], 0)
+            self._max_costs = np.where(self._has_offer, self.costs[rows, self._priciest], 0)
+        else:
+            # 目錄中沒有辨識出任何出版社欄位：出版社軸為空，每科都沒有供應，組合為空
+            self._cheapest = self._priciest = np.zeros(n_groups, dtype=np.intp)
+            self._min_costs = self._max_costs = np.zeros(n_groups)
+
+        # 各年級各出版社的總計與供應科目數
+        n_grades = len(self.grades)
+        self._grade_costs = np.zeros((n_grades, len(self.publishers)))
+        self._grade_subjects = np.zeros((n_grades, len(self.publishers)), dtype=np.intp)
+        np.add.at(self._grade_costs, self._group_grade, np.where(available, self.costs, 0))
+        np.add.at(self._grade_subjects, self._group_grade, available)
+
+    def _grade_rows(self, grade):
+        return np.flatnonzero(self._group_grade == self.grades.index(grade))
+
+    def subject_costs(self, grade):
+        """
+        該年級每科在各出版社的費用：列為科目、欄為出版社，未供應為空值
+        """
+        rows = self._grade_rows(grade)
+        return pd.DataFrame(self.costs[rows], index=pd.Index([self.groups[i][1] for i in rows], name="科目"),
+                            columns=self.publishers).astype("Int64")
+
+    def combination(self, grade, cheapest=True):
+        """
+        該年級每科都選最便宜（或最貴）版本時的組合：科目、版本、費用
+        """
+        rows = self._grade_rows(grade)
+        rows = rows[self._has_offer[rows]]
+        picks = (self._cheapest if cheapest else self._priciest)[rows]
+        costs = (self._min_costs if cheapest else self._max_costs)[rows]
+        return pd.DataFrame({"科目": [self.groups[i][1] for i in rows],
+                             "版本": [self.publishers[p] for p in picks],
+                             "費用": costs.astype(int)})
+
+    def grade_summary(self):
+        """
+        各年級總覽：最便宜與最貴組合的總計、差額，以及全部採用單一出版社時的總計
+        （只計該出版社有供應的科目，括號內為供應科目數）
+        """
+        n_grades = len(self.grades)
+        low = np.bincount(self._group_grade, weights=self._min_costs, minlength=n_grades)
+        high = np.bincount(self._group_grade, weights=self._max_costs, minlength=n_grades)
+        subjects = np.bincount(self._group_grade, weights=self._has_offer, minlength=n_grades)
+        summary = pd.DataFrame({"年級": [f"{g}年" for g in self.grades], "科目數": subjects.astype(int),
+                                "最便宜組合": low.astype(int), "最貴組合": high.astype(int),
+                                "差額": (high - low).astype(int)})
+        for p, pub in enumerate(self.publishers):
+            summary[pub] = [f"{int(cost)}（{n}科）" if n else "" for cost, n
+                            in zip(self._grade_costs[:, p], self._grade_subjects[:, p])]
+        return summary
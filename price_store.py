@@ -0,0 +1,212 @@
+from array import array
+from collections.abc import Mapping
+
+# 價格類別：課本、習作（矩陣中每個項目固定兩列）
+CATEGORIES = ("課", "習")
+_CAT_INDEX = {cat: i for i, cat in enumerate(CATEGORIES)}
+# 價格矩陣中代表「該出版社沒有這一格」的值，與價格 0 區分
+MISSING = -1
+# 鍵的三個欄位各佔 21 位元，合併成單一整數作為查詢鍵
+_BITS = 21
+
+
+class _Interner:
+    """
+    字串 ↔ 編號對照表，相同字串只存一份
+    """
+
+    def __init__(self, values=()):
+        self.values = []
+        self.codes = {}
+        for v in values: self.code(v)
+
+    def code(self, value):
+        c = self.codes.get(value)
+        if c is None:
+            c = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return c
+
+
+class _PriceView(Mapping):
+    """
+    單一項目單一類別的 {出版社: 價格} 唯讀檢視
+    """
+    __slots__ = ("_store", "_base")
+
+    def __init__(self, store, base):
+        self._store = store
+        self._base = base
+
+    def get(self, pub, default=None):
+        store = self._store
+        p = store._pub_codes.get(pub)
+        if p is None: return default
+        v = store._prices[self._base + p]
+        return default if v == MISSING else v
+
+    def __getitem__(self, pub):
+        v = self.get(pub, MISSING)
+        if v == MISSING: raise KeyError(pub)
+        return v
+
+    def __contains__(self, pub):
+        return self.get(pub, MISSING) != MISSING
+
+    def __iter__(self):
+        prices, base = self._store._prices, self._base
+        for p, name in enumerate(self._store._pubs.values):
+            if prices[base + p] != MISSING: yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class _ItemView(Mapping):
+    """
+    單一項目的 {"課": {...}, "習": {...}} 唯讀檢視
+    """
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store, item):
+        self._store = store
+        self._row = item * 2 * store._n_pubs
+
+    def __getitem__(self, cat):
+        store = self._store
+        return _PriceView(store, self._row + _CAT_INDEX[cat] * store._n_pubs)
+
+    def get(self, cat, default=None):
+        c = _CAT_INDEX.get(cat)
+        if c is None: return default
+        store = self._store
+        return _PriceView(store, self._row + c * store._n_pubs)
+
+    def __iter__(self):
+        return iter(CATEGORIES)
+
+    def __len__(self):
+        return len(CATEGORIES)
+
+
+class PriceStore(Mapping):
+    """
+    壓縮的價格目錄：年級、科目、冊別、出版社各自內嵌成編號表，
+    價格存成以 (項目, 類別, 出版社) 為索引的整數陣列。
+    對外維持 db[(年級, 科目, 冊別)]["課"][出版社] 的字典介面，
+    原本 db.get(key, {}).get("課", {}).get(version, 0) 的寫法不需修改。
+    """
+
+    def __init__(self, db=None):
+        self._grades, self._subjects, self._volumes = _Interner(), _Interner(), _Interner()
+        self._pubs = _Interner()
+        self._keys = array("q")
+        self._lookup = {}
+        self._prices = array("i")
+        if db: self._load(db)
+        self._bind()
+
+    def _bind(self):
+        # 查詢熱路徑常用的欄位，省去多層屬性存取
+        self._grade_codes = self._grades.codes
+        self._subject_codes = self._subjects.codes
+        self._volume_codes = self._volumes.codes
+        self._pub_codes = self._pubs.codes
+        self._n_pubs = len(self._pubs.values)
+
+    def _load(self, db):
+        # 先收齊出版社，價格矩陣的每列寬度才固定
+        for res in db.values():
+            for cat in CATEGORIES:
+                for pub in res.get(cat, {}): self._pubs.code(pub)
+        n_pubs = len(self._pubs.values)
+        row = array("i", [MISSING]) * (len(CATEGORIES) * n_pubs)
+        for (g, s, v), res in db.items():
+            packed = self._pack(self._grades.code(g), self._subjects.code(s), self._volumes.code(v))
+            self._lookup[packed] = len(self._keys)
+            self._keys.append(packed)
+            prices = array("i", row)
+            for c, cat in enumerate(CATEGORIES):
+                for pub, price in res.get(cat, {}).items():
+                    prices[c * n_pubs + self._pubs.codes[pub]] = price
+            self._prices.extend(prices)
+
+    @staticmethod
+    def _pack(g, s, v):
+        return (g << (2 * _BITS)) | (s << _BITS) | v
+
+    def _unpack(self, packed):
+        mask = (1 << _BITS) - 1
+        return (self._grades.values[packed >> (2 * _BITS)],
+                self._subjects.values[(packed >> _BITS) & mask],
+                self._volumes.values[packed & mask])
+
+    def _item(self, key):
+        try:
+            g, s, v = key
+            return self._lookup[(self._grade_codes[g] << (2 * _BITS)) | (self._subject_codes[s] << _BITS)
+                                | self._volume_codes[v]]
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @property
+    def publishers(self):
+        return list(self._pubs.values)
+
+    def price_columns(self):
+        """
+        回傳 (項目鍵清單, 出版社清單, 價格陣列)，價格陣列依 (項目, 類別, 出版社) 順序排列、缺價為 MISSING，
+        可直接轉成矩陣做批次計算（見 price_compare）
+        """
+        return list(self), list(self._pubs.values), self._prices
+
+    def price(self, key, cat, pub, default=0):
+        """
+        直接查單一價格，不建立檢視物件（查價熱路徑請用這個，而非 db.get(key).get(cat).get(pub)）。
+        沒有該項目、類別或出版社時回傳 default
+        """
+        # 與 _item 相同的查詢，內嵌以省去一次方法呼叫
+        try:
+            g, s, v = key
+            item = self._lookup[(self._grade_codes[g] << (2 * _BITS)) | (self._subject_codes[s] << _BITS)
+                                | self._volume_codes[v]]
+            v = self._prices[(item * 2 + _CAT_INDEX[cat]) * self._n_pubs + self._pub_codes[pub]]
+        except (KeyError, TypeError, ValueError):
+            return default
+        return default if v == MISSING else v
+
+    # 字典相容介面：每次查詢都要建立檢視物件，比 price() 慢數倍，只供相容舊程式與少量查詢
+    def get(self, key, default=None):
+        try:
+            g, s, v = key
+            item = self._lookup[(self._grade_codes[g] << (2 * _BITS)) | (self._subject_codes[s] << _BITS)
+                                | self._volume_codes[v]]
+        except (KeyError, TypeError, ValueError):
+            return default
+        return _ItemView(self, item)
+
+    def __getitem__(self, key):
+        view = self.get(key)
+        if view is None: raise KeyError(key)
+        return view
+
+    def __contains__(self, key):
+        return self._item(key) is not None
+
+    def __iter__(self):
+        for packed in self._keys: yield self._unpack(packed)
+
+    def __len__(self):
+        return len(self._keys)
+
+    # 序列化時只保存編號表與陣列，查詢用的字典載入後再重建
+    def __getstate__(self):
+        return {"grades": self._grades.values, "subjects": self._subjects.values, "volumes": self._volumes.values,
+                "pubs": self._pubs.values, "keys": self._keys, "prices": self._prices}
+
+    def __setstate__(self, state):
+        self._grades, self._subjects = _Interner(state["grades"]), _Interner(state["subjects"])
+        self._volumes, self._pubs = _Interner(state["volumes"]), _Interner(state["pubs"])
+        self._keys, self._prices = state["keys"], state["prices"]
+        self._lookup = {packed: i for i, packed in enumerate(self._keys)}
+        self._bind()
@@ -0,0 +1,95 @@
+import io
+import csv
+import codecs
+from collections import defaultdict
+
+from cart import Cart
+
+
+def group_by_grade(cart):
+    """
+    將清單依年級分組，回傳 (各年級項目, 各年級總計)；Cart 直接取用隨時維護的分組結果
+    """
+    if isinstance(cart, Cart):
+        return cart.grade_groups(), cart.grade_totals()
+    grade_groups = defaultdict(list)
+    grade_totals = defaultdict(int)
+    for item in cart:
+        grade_groups[item['年級']].append(item)
+        grade_totals[item['年級']] += item['小計']
+    return grade_groups, grade_totals
+
+
+def iter_report_rows(cart):
+    """
+    逐列產生費用明細表（每個年級 5 欄一組、總計置頂）
+    """
+    grade_groups, grade_totals = group_by_grade(cart)
+    sorted_grades = sorted(grade_groups.keys())
+    if not sorted_grades: return
+
+    # 年級標題列
+    h_row = []
+    for g in sorted_grades: h_row += [f"【{g}】", "", "", "", ""]
+    yield h_row
+
+    # 總計置頂列
+    total_row = []
+    for g in sorted_grades: total_row += ["★年級總計", "", "", grade_totals[g], ""]
+    yield total_row
+    yield []
+
+    # 填充明細
+    max_b = max(len(grade_groups[g]) for g in sorted_grades)
+    for b_idx in range(max_b):
+        r1, r2, r3 = [], [], []
+        for g in sorted_grades:
+            books = grade_groups[g]
+            if b_idx < len(books):
+                b = books[b_idx]
+                r1 += ["科目", b['科目'], "課本", b['課本'], ""]
+                r2 += ["版本", b['版本'], "習作", b['習作'], ""]
+                r3 += ["冊別", b['冊別'], "小計", b['小計'], ""]
+            else:
+                r1 += [""]*5; r2 += [""]*5; r3 += [""]*5
+        yield r1; yield r2; yield r3; yield []
+
+
+def write_report(cart, f):
+    """
+    將費用明細表以 CSV 逐列寫入 f
+    """
+    csv.writer(f).writerows(iter_report_rows(cart))
+
+
+def iter_report_csv(cart, encoding='utf-8-sig', chunk_rows=400):
+    """
+    串流匯出：每 chunk_rows 列產生一段已編碼的 bytes，可直接寫入 HTTP 回應或檔案，
+    不必先在記憶體中組出整份報表字串（BOM 只出現在第一段）
+    """
+    encoder = codecs.getincrementalencoder(encoding)()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for i, row in enumerate(iter_report_rows(cart), 1):
+        writer.writerow(row)
+        if i % chunk_rows == 0:
+            yield encoder.encode(buffer.getvalue())
+            buffer.seek(0)
+            buffer.truncate()
+    yield encoder.encode(buffer.getvalue(), final=True)
+
+
+def build_report_csv(cart):
+    """
+    產生費用明細表 CSV 字串
+    """
+    output = io.StringIO()
+    write_report(cart, output)
+    return output.getvalue()
+
+
+def build_report_bytes(cart):
+    """
+    產生供下載的費用明細表（UTF-8 含 BOM，Excel 可直接開啟）；由串流匯出組成，不另外保留整份字串
+    """
+    return b"".join(iter_report_csv(cart))
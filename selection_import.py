@@ -0,0 +1,137 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from pdf_parser import CatalogIndex
+from catalog_store import CatalogView
+from price_store import PriceStore, CATEGORIES, MISSING
+
+# 支援國中小多種年級寫法
+GRADE_COLS = {
+    "一年級": "1", "二年級": "2", "三年級": "3", "四年級": "4", "五年級": "5", "六年級": "6",
+    "七年級": "7", "八年級": "8", "九年級": "9", "初一": "7", "初二": "8", "初三": "9"
+}
+
+
+def read_selection_csv(raw_data):
+    """
+    讀取版本一覽表 CSV（已解碼字串），自動找尋含「年級」的標題列
+    """
+    df_full = pd.read_csv(io.StringIO(raw_data))
+    header_idx = 0
+    for i, row in df_full.iterrows():
+        if any("年級" in str(cell) for cell in row):
+            header_idx = i
+            break
+    return pd.read_csv(io.StringIO(raw_data), header=header_idx + 1)
+
+
+def _price_frame(store, skip):
+    """
+    單一 PriceStore 的價格表：每個有課本或習作價格的 (項目, 出版社) 一列，缺價以 0 計。
+    以價格矩陣批次取出，不逐項建立字典檢視；skip 中的項目不列入，本目錄的項目會加入 skip
+    """
+    keys, pubs, raw = store.price_columns()
+    prices = np.frombuffer(raw, dtype=np.intc).reshape(len(keys), len(CATEGORIES), len(pubs))
+    owned = np.fromiter((k not in skip for k in keys), dtype=bool, count=len(keys))
+    skip.update(keys)
+    items, cols = np.nonzero((prices != MISSING).any(axis=1) & owned[:, None])
+    frame = pd.DataFrame(keys, columns=["年級", "科目", "冊別"]).iloc[items].reset_index(drop=True)
+    frame["版本"] = np.array(pubs, dtype=object)[cols]
+    for c, col in enumerate(("課本", "習作")):
+        found = prices[items, c, cols]
+        frame[col] = np.where(found == MISSING, 0, found).astype(int)
+    return frame
+
+
+class CatalogTable:
+    """
+    價格 db 的表格形式，每份目錄只需建立一次，可重複用於多份一覽表。
+    prices：每個 (年級, 科目, 冊別, 版本) 一列，附課本與習作價格。
+    index：科目對應用的 CatalogIndex（未提供時由 db 建立）。
+    """
+
+    def __init__(self, db, index=None):
+        self.index = index if index is not None else CatalogIndex(db)
+        # 合併檢視依序取各份目錄，同一項目以先載入的為準（與 CatalogView.get 相同）
+        stores = db.dbs if isinstance(db, CatalogView) else [db]
+        skip = set()
+        frames = [_price_frame(store if isinstance(store, PriceStore) else PriceStore(store), skip)
+                  for store in stores]
+        self.prices = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        # 價格查詢用的多層索引，建立一次後各次匯入共用（雜湊表由 pandas 快取在索引上）
+        self.price_keys = pd.MultiIndex.from_frame(self.prices[["年級", "科目", "冊別", "版本"]])
+
+
+def first_volume(grade, volumes):
+    """
+    預設的冊別規則：取冊別最小者
+    """
+    return volumes[0]
+
+
+def semester_volume(grade, volumes):
+    """
+    網頁版（app.py）沿用的冊別規則：優先取名稱含「年級 × 2」的冊別（如 3 年級取含 "6" 者），
+    沒有時取冊別最小者
+    """
+    target = str(int(grade) * 2)
+    return next((v for v in volumes if target in v), volumes[0])
+
+
+def _selection_long(df):
+    """
+    將一覽表轉成長表：每個 (一覽表科目, 年級) 一列，保留原本的列與欄順序
+    """
+    subject_col = df.columns[0]
+    value_cols = [g for g in GRADE_COLS if g in df.columns]
+    wide = df[[subject_col] + value_cols].copy()
+    wide.columns = ["一覽表科目"] + value_cols
+    wide["列序"] = range(len(wide))
+    long = wide.melt(id_vars=["一覽表科目", "列序"], value_vars=value_cols, var_name="年級欄", value_name="版本")
+    long["欄序"] = long["年級欄"].map({g: i for i, g in enumerate(value_cols)})
+    long["年級"] = long["年級欄"].map(GRADE_COLS)
+    # 空白格先補成空字串：新版 pandas 的 astype(str) 會保留 NaN，不會變成 "nan"
+    long["一覽表科目"] = long["一覽表科目"].fillna("").astype(str).str.strip()
+    long["版本"] = long["版本"].fillna("").astype(str).str.strip()
+    bad = ["", "nan"]
+    return long[~long["一覽表科目"].isin(bad) & ~long["版本"].isin(bad)]
+
+
+def import_selection(df, table, issues=None, pick_volume=first_volume, keep_unpriced=False):
+    """
+    以批次合併計算一覽表每一格對應的價格，回傳購物清單列（課本與習作皆為 0 者預設排除，
+    keep_unpriced 為 True 時保留，價格以 0 列出）。
+    科目對應見 CatalogIndex.resolve_subject，對應到的科目由 pick_volume(年級, 排序後的冊別) 選出冊別。
+    issues 為 list 時，找不到或對應到多個科目的 (年級, 一覽表科目) 會附加到其中：
+    {"年級", "一覽表科目", "問題"}；這些格子不會匯入。
+    """
+    long = _selection_long(df)
+    if long.empty or table.prices.empty:
+        return []
+
+    # 1. 科目對應：每個不重複的 (年級, 一覽表科目) 查一次索引
+    index, targets = table.index, []
+    for g, raw in long[["年級", "一覽表科目"]].drop_duplicates().itertuples(index=False):
+        subject, candidates = index.resolve_subject(g, raw)
+        if subject:
+            targets.append((g, raw, subject, pick_volume(g, index.volumes(g, subject))))
+        elif issues is not None:
+            problem = f"對應到多個科目：{'、'.join(candidates)}" if candidates else "找不到對應科目"
+            issues.append({"年級": f"{g}年", "一覽表科目": raw, "問題": problem})
+    target = pd.DataFrame(targets, columns=["年級", "一覽表科目", "科目", "冊別"])
+
+    # 2. 以多層索引批次查價，查無價格者視為 0
+    merged = long.merge(target, on=["年級", "一覽表科目"])
+    pos = table.price_keys.get_indexer(pd.MultiIndex.from_frame(merged[["年級", "科目", "冊別", "版本"]]))
+    found = pos >= 0
+    for col in ("課本", "習作"):
+        merged[col] = np.where(found, table.prices[col].to_numpy()[pos], 0).astype(int)
+    if not keep_unpriced:
+        merged = merged[(merged["課本"] > 0) | (merged["習作"] > 0)]
+    merged = merged.sort_values(["列序", "欄序"], kind="stable")
+
+    merged["小計"] = merged["課本"] + merged["習作"]
+    merged["年級"] = merged["年級"] + "年"
+    return merged[["年級", "科目", "版本", "冊別", "課本", "習作", "小計"]].to_dict("records")
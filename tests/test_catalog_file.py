@@ -0,0 +1,76 @@
+"""
+編譯目錄檔：內容不完整或損壞時一律拋出 CatalogFileError（介面以 ValueError 攔截）
+"""
+import queue
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from catalog_file import CatalogFileError, load_catalog, save_catalog
+from pdf_parser import CatalogIndex
+from price_store import PriceStore
+
+DB = {("1", "國語", "第1冊"): {"課": {"南一": 100}, "習": {"南一": 40}},
+      ("2", "數學", "第3冊"): {"課": {"康軒": 90}, "習": {}}}
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    path = tmp_path / "價格.tbcat"
+    store = PriceStore(DB)
+    save_catalog(str(path), store, ["南一", "康軒"], CatalogIndex(store), source="價格.pdf")
+    return path
+
+
+def _execute(path, sql, *args):
+    with sqlite3.connect(path) as con:
+        con.execute(sql, args)
+    con.close()
+
+
+def test_round_trip(catalog):
+    db, versions, index = load_catalog(catalog.read_bytes())
+    assert versions == ["南一", "康軒"]
+    assert db.price(("1", "國語", "第1冊"), "習", "南一") == 40
+    assert index.subjects("2") == ["數學"]
+
+
+@pytest.mark.parametrize("sql, args", [
+    ("DELETE FROM blobs WHERE name = ?", ("prices",)),
+    ("DELETE FROM blobs WHERE name = ?", ("keys",)),
+    ("DELETE FROM meta WHERE name = ?", ("byteorder",)),
+    ("DELETE FROM meta WHERE name = ?", ("index",)),
+    ("UPDATE blobs SET data = substr(data, 1, 4) WHERE name = ?", ("prices",)),
+    ("UPDATE blobs SET typecode = 'x' WHERE name = ?", ("keys",)),
+    ("UPDATE meta SET value = '{' WHERE name = ?", ("versions",)),
+    ("UPDATE meta SET value = '[]' WHERE name = ?", ("index",)),
+    ("DROP TABLE blobs", ()),
+])
+def test_damaged_catalog(catalog, sql, args):
+    _execute(catalog, sql, *args)
+    with pytest.raises(CatalogFileError):
+        load_catalog(catalog.read_bytes())
+    with pytest.raises(CatalogFileError):
+        load_catalog(str(catalog))
+
+
+def test_not_a_catalog():
+    with pytest.raises(CatalogFileError):
+        load_catalog(b"%PDF-1.4")
+
+
+def test_missing_catalog(tmp_path):
+    with pytest.raises(CatalogFileError):
+        load_catalog(str(tmp_path / "已移除.tbcat"))
+
+
+def test_reopen_missing_catalog(tmp_path):
+    # 上次的目錄檔已被移除：背景工作仍須送出結束訊息，_poll_load 才不會一直等待
+    pytest.importorskip("tkinter")
+    from main import SortedSubjectTextbookApp
+
+    app = SimpleNamespace(load_queue=queue.Queue(), catalog_cache=None)
+    last = {"name": "價格.tbcat", "path": str(tmp_path / "價格.tbcat")}
+    SortedSubjectTextbookApp._reopen_worker(app, last, None)
+    assert app.load_queue.get_nowait() == ("cancelled", "價格.tbcat")
@@ -0,0 +1,57 @@
+"""
+頁面表格快取：修訂版 PDF 沿用未變動頁面的表格時，結果須與完整重新解析相同
+"""
+import pytest
+
+from benchmarks.synth_pdf import write_pdf
+from catalog_cache import PageTableCache
+from pdf_parser import page_fingerprints, parse_pdf
+
+
+def _items(parsed):
+    db, versions, _ = parsed
+    return versions, {key: {cat: dict(db[key][cat]) for cat in ("課", "習")} for key in db}
+
+
+@pytest.fixture
+def editions(tmp_path):
+    # 兩版內容不同、每頁都包成 Form XObject 的價格 PDF
+    paths = []
+    for seed in (0, 1):
+        path = tmp_path / f"ed{seed}.pdf"
+        write_pdf(str(path), pages=4, seed=seed, xobject=True)
+        paths.append(str(path))
+    return paths
+
+
+def test_fingerprint_covers_xobject_content(editions):
+    old, new = (page_fingerprints(path) for path in editions)
+    assert len(set(old)) == 4
+    assert not set(old) & set(new)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_revised_edition_through_page_cache(editions, tmp_path, workers):
+    cache = PageTableCache(str(tmp_path / "pages.sqlite"))
+    parse_pdf(editions[0], page_cache=cache)
+    assert _items(parse_pdf(editions[1], workers=workers, page_cache=cache)) == _items(parse_pdf(editions[1]))
+
+
+class _EvictedCache:
+    """
+    known() 回報一半的頁面有快取（其餘頁面仍交給程序池），但 get() 時已被其他工作階段淘汰
+    """
+
+    def known(self, hashes):
+        return set(hashes[::2])
+
+    def get(self, page_hash):
+        return None
+
+    def put(self, page_hash, tables):
+        pass
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_evicted_pages_are_extracted(editions, workers):
+    assert _items(parse_pdf(editions[0], workers=workers, page_cache=_EvictedCache())) == _items(parse_pdf(editions[0]))
@@ -0,0 +1,56 @@
+"""
+各介面的解析規則：網頁版與桌面版沿用改版前各自的價格與欄位規則
+"""
+import pytest
+
+from pdf_parser import APP_RULES, DEFAULT_RULES, DESKTOP_RULES, CatalogBuilder, extract_first_price, extract_price
+
+# 年級與科目欄位對調、出版社分兩列標示、儲存格內有換行與附註
+TABLE = [["", "年級", "科目", "冊別", "類別", "", "", "翰林"],
+         ["", "", "", "", "", "南一", "康軒", ""],
+         ["1", "一\n年級", "國語 1", "第1冊", "課本", "120 (含CD 30)", "-", "1,050"],
+         ["2", "一\n年級", "國語", "第1冊", "習作", "075\n", "", "3-5"]]
+
+
+def _parse(rules, tables=(TABLE,)):
+    builder = CatalogBuilder(rules=rules)
+    for table in tables: builder.feed_table(table)
+    db, versions, _ = builder.result()
+    return versions, {key: {cat: dict(db[key][cat]) for cat in ("課", "習") if db[key][cat]} for key in db}
+
+
+@pytest.mark.parametrize("cell, first, digits", [
+    ("120 (含CD 30)", 120, 12030), ("075\n", 75, 75), (",75", 75, 75), ("1,050", 1050, 1050),
+    ("-", 0, 0), ("3-5", 0, 35), ("", 0, 0), (None, 0, 0),
+])
+def test_price_rules(cell, first, digits):
+    assert extract_first_price(cell) == first
+    assert extract_price(cell) == digits
+
+
+def test_default_rules():
+    assert _parse(DEFAULT_RULES) == (["南一", "康軒", "翰林"], {
+        ("一年級", "國語", "第1冊"): {"課": {"南一": 12030, "康軒": 0, "翰林": 1050},
+                                   "習": {"南一": 75, "康軒": 0, "翰林": 35}}})
+
+
+def test_app_rules():
+    # 第一段數字、含 "-" 為 0；欄位依標題偵測，但不移除換行
+    assert _parse(APP_RULES) == (["南一", "康軒", "翰林"], {
+        ("一\n年級", "國語", "第1冊"): {"課": {"南一": 120, "康軒": 0, "翰林": 1050},
+                                     "習": {"南一": 75, "康軒": 0, "翰林": 0}}})
+
+
+def test_desktop_rules():
+    # 固定欄位（科目 1、年級 2、冊別 3），只採用第一個含出版社名稱的標題列
+    assert _parse(DESKTOP_RULES) == (["翰林"], {
+        ("國語 1", "一\n年級", "第1冊"): {"課": {"翰林": 1050}},
+        ("國語", "一\n年級", "第1冊"): {"習": {"翰林": 0}}})
+
+
+def test_desktop_rules_keep_first_header():
+    later = [["", "科目", "年級", "冊別", "類別", "南一", "康軒", "翰林"],
+             ["1", "數學", "2", "第3冊", "課本", "90", "80", "70"]]
+    versions, db = _parse(DESKTOP_RULES, (TABLE, later))
+    assert versions == ["翰林"]
+    assert db[("2", "數學", "第3冊")] == {"課": {"翰林": 70}}
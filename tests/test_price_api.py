@@ -0,0 +1,74 @@
+"""
+本機價格查詢 API：實際啟動伺服器（port=0），以 HTTP 查價
+"""
+import json
+import threading
+import http.client
+from urllib.parse import urlencode
+
+import pytest
+
+from pdf_parser import CatalogIndex
+from price_api import MAX_BODY_BYTES, PriceService, make_server
+from price_store import PriceStore
+
+DB = {("1", "國語", "第1冊"): {"課": {"南一": 100}, "習": {"南一": 40}}}
+
+
+@pytest.fixture
+def server():
+    store = PriceStore(DB)
+    srv = make_server(PriceService(store, ["南一"], CatalogIndex(store)), port=0, quiet=True)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+    thread.join(5)
+
+
+def _request(server, method, path, body=None, headers=None):
+    con = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    try:
+        con.request(method, path, body=body, headers=headers or {})
+        response = con.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        con.close()
+
+
+def _price_path(**query):
+    return "/price?" + urlencode(query)
+
+
+def test_lookup(server):
+    status, body = _request(server, "GET", _price_path(grade="1年", subject="國語", volume="第1冊", publisher="南一"))
+    assert status == 200
+    assert (body["found"], body["textbook"], body["workbook"], body["subtotal"]) == (True, 100, 40, 140)
+
+
+def test_unknown_key(server):
+    status, body = _request(server, "GET", _price_path(grade="1", subject="國語", volume="第9冊", publisher="南一"))
+    assert status == 404
+    assert body["found"] is False
+    assert _request(server, "GET", "/unknown")[0] == 404
+
+
+def test_batch(server):
+    items = [{"grade": "1", "subject": "國語", "volume": "第1冊", "publisher": "南一"}, {"grade": "1"}]
+    status, body = _request(server, "POST", "/prices", json.dumps({"items": items}))
+    assert status == 200
+    assert body["results"][0]["subtotal"] == 140
+    assert "error" in body["results"][1]
+
+
+@pytest.mark.parametrize("body, headers, status", [
+    ("{", {}, 400),
+    ('{"items": 5}', {}, 400),
+    (None, {}, 400),
+    ("", {"Content-Length": "-1"}, 400),
+    ("", {"Content-Length": "abc"}, 400),
+    ("", {"Content-Length": str(MAX_BODY_BYTES + 1)}, 413),
+])
+def test_bad_body(server, body, headers, status):
+    assert _request(server, "POST", "/prices", body, headers)[0] == status
@@ -0,0 +1,66 @@
+from benchmarks.synth_pdf import write_pdf
+from pdf_parser import parse_pdf
+from price_compare import PublisherComparison
+from price_store import PriceStore
+
+
+DB = {
+    ("1", "國語", "第1冊"): {"課": {"甲": 100, "乙": 90}, "習": {"甲": 40, "乙": 60}},
+    ("1", "國語", "第2冊"): {"課": {"甲": 110, "乙": 95}, "習": {"甲": 40}},
+    ("1", "數學", "第1冊"): {"課": {"甲": 80}, "習": {"甲": 30}},
+    ("2", "國語", "第3冊"): {"課": {"乙": 120}, "習": {"乙": 50}},
+}
+
+
+def test_cheapest_and_priciest_combination():
+    # 缺習作的冊以 0 計，乙的國語仍算有供應
+    comparison = PublisherComparison(PriceStore(DB), ["甲", "乙"])
+    low = comparison.combination("1")
+    assert low.to_dict("list") == {"科目": ["國語", "數學"], "版本": ["乙", "甲"], "費用": [245, 110]}
+    high = comparison.combination("1", cheapest=False)
+    assert high.to_dict("list") == {"科目": ["國語", "數學"], "版本": ["甲", "甲"], "費用": [290, 110]}
+    summary = comparison.grade_summary()
+    assert summary["最便宜組合"].tolist() == [355, 170]
+    assert summary["乙"].tolist() == ["245（1科）", "170（1科）"]
+
+
+def test_catalog_without_publishers():
+    # 有項目但沒有辨識出任何出版社欄位的目錄：不可因出版社軸為空而出錯
+    db = {key: {"課": {}, "習": {}} for key in DB}
+    for source in (db, PriceStore(db)):
+        comparison = PublisherComparison(source, [])
+        assert comparison.publishers == []
+        assert comparison.combination("1").empty
+        assert comparison.combination("2", cheapest=False).empty
+        summary = comparison.grade_summary()
+        assert summary["最便宜組合"].tolist() == [0, 0]
+        assert summary["科目數"].tolist() == [0, 0]
+        assert comparison.subject_costs("1").shape == (2, 0)
+
+
+def test_zero_prices_are_not_offered():
+    # 「-」或空白的格子解析為 0：該出版社視為未供應，不可被選為 0 元的最便宜版本
+    db = {
+        ("1", "國語", "第1冊"): {"課": {"甲": 100, "乙": 0}, "習": {"甲": 40, "乙": 0}},
+        ("1", "數學", "第1冊"): {"課": {"甲": 80, "乙": 0}, "習": {"甲": 0, "乙": 30}},
+    }
+    comparison = PublisherComparison(PriceStore(db), ["甲", "乙"])
+    assert comparison.combination("1").to_dict("list") == {"科目": ["國語", "數學"], "版本": ["甲", "乙"],
+                                                          "費用": [140, 30]}
+    assert comparison.grade_summary()["乙"].tolist() == ["30（1科）"]
+
+
+def test_synthetic_catalog_cheapest_is_never_zero(tmp_path):
+    # 合成價格表以「-」表示未供應，與實際 PDF 相同
+    path = tmp_path / "synth.pdf"
+    write_pdf(str(path), pages=4, seed=0)
+    db, versions, index = parse_pdf(str(path))
+    comparison = PublisherComparison(db, versions, index)
+    for grade in comparison.grades:
+        low = comparison.combination(grade)
+        assert (low["費用"] > 0).all(), low
+        # 每個被選中的版本在該科每冊都有大於 0 的價格
+        for subject, pub in zip(low["科目"], low["版本"]):
+            for vol in index.volumes(grade, subject):
+                key = (grade, subject, vol)
+                assert db.price(key, "課", pub) > 0 or db.price(key, "習", pub) > 0
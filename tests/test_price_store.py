@@ -0,0 +1,96 @@
+"""
+PriceStore 的查價方式與批次路徑：結果須與原本的字典寫法相同
+"""
+import random
+
+import pytest
+
+from catalog_diff import diff_catalogs
+from catalog_store import CatalogView
+from price_api import PriceService
+from price_store import CATEGORIES, PriceStore
+from selection_import import CatalogTable
+
+PUBS = ["南一", "康軒", "翰林", "育成"]
+
+
+def _catalog(seed, n=300):
+    rnd = random.Random(seed)
+    db = {}
+    for i in range(n):
+        key = (str(i % 9 + 1), f"科目{i % 13}", f"第{i}冊")
+        # 價格 0 與缺價要能區分，也有某一類別完全沒有價格的項目
+        db[key] = {cat: {p: rnd.choice([0, 50, 120]) for p in PUBS if rnd.random() < 0.6} for cat in CATEGORIES}
+    return db
+
+
+@pytest.fixture
+def db():
+    return _catalog(0)
+
+
+def test_price_matches_dict_lookup(db):
+    store = PriceStore(db)
+    for key in list(db) + [("1", "不存在", "第1冊"), ("1",), None]:
+        res = db.get(key, {}) if isinstance(key, tuple) and len(key) == 3 else {}
+        for cat in CATEGORIES:
+            for pub in PUBS + ["三民"]:
+                expected = res.get(cat, {}).get(pub)
+                assert store.price(key, cat, pub, None) == expected
+                assert store.get(key, {}).get(cat, {}).get(pub) == expected
+                if key in db: assert (pub in store[key][cat]) == (expected is not None)
+
+
+def test_catalog_view_price_prefers_first(db):
+    other = _catalog(1)
+    extra = ("1", "額外", "第1冊")
+    db[extra] = {"課": {"南一": 77}, "習": {}}
+    view = CatalogView([PriceStore(other), PriceStore(db)])
+    for key in list(other)[:50]:
+        assert view.price(key, "課", "南一") == other[key]["課"].get("南一", 0)
+    assert view.price(extra, "課", "南一") == 77
+    assert view.price(("9", "無", "無"), "課", "南一", None) is None
+
+
+def test_price_service_found_flag(db):
+    service = PriceService(PriceStore(db), PUBS, None)
+    for (g, s, v), res in list(db.items())[:100]:
+        for pub in PUBS:
+            r = service.lookup({"grade": g, "subject": s, "volume": v, "publisher": pub})
+            assert r["found"] == (pub in res["課"] or pub in res["習"])
+            assert r["subtotal"] == res["課"].get(pub, 0) + res["習"].get(pub, 0)
+
+
+def _table_rows(db):
+    rows = set()
+    for (g, s, v), res in db.items():
+        for pub in dict.fromkeys(list(res["課"]) + list(res["習"])):
+            rows.add((g, s, v, pub, res["課"].get(pub, 0), res["習"].get(pub, 0)))
+    return rows
+
+
+def test_catalog_table_matches_dict_rows(db):
+    other = _catalog(1)
+    assert set(CatalogTable(PriceStore(db)).prices.itertuples(index=False, name=None)) == _table_rows(db)
+    merged = {**db, **other}  # 合併時以第一份（other）為準
+    view = CatalogView([PriceStore(other), PriceStore(db)])
+    assert set(CatalogTable(view).prices.itertuples(index=False, name=None)) == _table_rows(merged)
+
+
+def test_diff_catalogs(db):
+    new = {key: {cat: dict(prices) for cat, prices in res.items()} for key, res in db.items()}
+    keys = list(new)
+    new[keys[0]]["課"]["南一"] = 999  # 調整或新增
+    new[keys[1]]["習"].pop(next(iter(new[keys[1]]["習"]), None), None)  # 刪除
+    del new[keys[2]]
+    new[("1", "新科目", "第1冊")] = {"課": {"三民": 0}, "習": {}}
+    expected = []
+    for key in dict.fromkeys(list(db) + list(new)):
+        for cat in CATEGORIES:
+            old_prices, new_prices = db.get(key, {}).get(cat, {}), new.get(key, {}).get(cat, {})
+            for pub in dict.fromkeys(list(old_prices) + list(new_prices)):
+                a, b = old_prices.get(pub), new_prices.get(pub)
+                if a != b: expected.append((*key, cat, pub, "" if a is None else a, "" if b is None else b))
+    rows = diff_catalogs(PriceStore(db), PriceStore(new))
+    assert sorted(tuple(r.values())[:7] for r in rows) == sorted(expected)
+    assert {r["變動"] for r in rows if r["版本"] == "三民"} == {"新增"}
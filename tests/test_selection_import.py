@@ -0,0 +1,38 @@
+"""
+一覽表匯入：冊別規則與查無價格的格子
+"""
+from selection_import import CatalogTable, import_selection, read_selection_csv, semester_volume
+from price_store import PriceStore
+
+DB = PriceStore({
+    ("1", "國語", "第1冊"): {"課": {"康軒": 100}, "習": {"康軒": 40}},
+    ("1", "國語", "第2冊"): {"課": {"康軒": 110}, "習": {"康軒": 45}},
+    ("1", "數學", "第1冊"): {"課": {"南一": 80}, "習": {}},
+    ("2", "國語", "第3冊"): {"課": {"康軒": 120}, "習": {"康軒": 50}},
+    ("2", "國語", "第4冊"): {"課": {"康軒": 130}, "習": {}},
+    ("2", "數學", "第3冊"): {"課": {"南一": 90}, "習": {}},
+})
+CSV = "教科書一覽表,,\n科目/年級,一年級,二年級\n國語,康軒,康軒\n數學,翰林,\n"
+
+
+def _import(**options):
+    return import_selection(read_selection_csv(CSV), CatalogTable(DB), **options)
+
+
+def test_default_rules():
+    # 冊別取最小者；翰林沒有數學價格，不匯入
+    assert [(r["年級"], r["科目"], r["冊別"], r["小計"]) for r in _import()] == [
+        ("1年", "國語", "第1冊", 140), ("2年", "國語", "第3冊", 170)]
+
+
+def test_app_rules():
+    # 冊別優先取含「年級 × 2」者；查無價格的格子以 0 加入，一覽表的空白格不算
+    rows = _import(pick_volume=semester_volume, keep_unpriced=True)
+    assert [(r["年級"], r["科目"], r["版本"], r["冊別"], r["課本"], r["習作"]) for r in rows] == [
+        ("1年", "國語", "康軒", "第2冊", 110, 45), ("2年", "國語", "康軒", "第4冊", 130, 0),
+        ("1年", "數學", "翰林", "第1冊", 0, 0)]
+
+
+def test_semester_volume_falls_back_to_first():
+    assert semester_volume("3", ["第5冊", "第6冊"]) == "第6冊"
+    assert semester_volume("3", ["上", "下"]) == "上"
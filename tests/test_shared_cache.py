@@ -0,0 +1,62 @@
+"""
+程序內共用目錄快取：估計大小（序列化）時不可持有鎖，否則會擋住其他工作階段的查詢
+"""
+import os
+import threading
+
+from catalog_cache import CatalogCache, SharedCatalogCache
+
+
+class _SlowSizeCache(SharedCatalogCache):
+    def __init__(self):
+        super().__init__()
+        self.sizing = threading.Event()
+        self.release = threading.Event()
+        self.locked_while_sizing = None
+
+    def _size(self, value):
+        self.locked_while_sizing = self._lock.locked()
+        self.sizing.set()
+        self.release.wait(5)
+        return 1
+
+
+def test_size_computed_outside_lock():
+    cache = _SlowSizeCache()
+    cache._entries["other"] = ("舊結果", 1)
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(r=cache.load_or_parse(b"pdf", lambda report: "新結果")))
+    worker.start()
+    assert cache.sizing.wait(5)
+    # 估計大小期間其他工作階段仍可查詢
+    assert cache.get("other") == "舊結果"
+    cache.release.set()
+    worker.join(5)
+    assert cache.locked_while_sizing is False
+    key, value, hit = result["r"]
+    assert (value, hit) == ("新結果", False)
+    assert cache.get(key) == "新結果"
+
+
+class _FullDisk(CatalogCache):
+    def put(self, key, value):
+        raise OSError(28, "No space left on device")
+
+
+def test_disk_write_failure_keeps_result(tmp_path):
+    # 磁碟快取寫入失敗仍回傳解析結果，並留在記憶體供下次查詢
+    cache = SharedCatalogCache(disk=_FullDisk(str(tmp_path)))
+    key, value, hit = cache.load_or_parse(b"pdf", lambda report: "新結果")
+    assert (value, hit) == ("新結果", False)
+    assert cache.get(key) == "新結果"
+
+
+def test_disk_entry_evicted_after_read(tmp_path, monkeypatch):
+    # 讀取後、更新使用時間前檔案被其他程序淘汰：仍回傳已讀到的結果
+    disk = CatalogCache(str(tmp_path))
+    disk.put("k", "結果")
+
+    def evicted(path, *args, **kwargs):
+        raise FileNotFoundError(path)
+    monkeypatch.setattr(os, "utime", evicted)
+    assert disk.get("k") == "結果"